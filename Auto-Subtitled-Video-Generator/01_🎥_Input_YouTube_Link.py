@@ -1,32 +1,27 @@
-import whisper
-import yt_dlp
 import requests
 import time
 import streamlit as st
 from streamlit_lottie import st_lottie
 import numpy as np
-import os
-from typing import Iterator
-from io import StringIO
-from utils import write_vtt, write_srt
-import ffmpeg
 from languages import LANGUAGES
-import torch
-from zipfile import ZipFile
-from io import BytesIO
+from model_registry import get_model, registry, start_warmup, supported_precisions
+from decoding import PROFILES
+from jobs import get_manager, new_job_id
+from job_ui import (
+    BUTTON_LABELS, current_job, job_finished, player_subtitles, remember_job, show_batch_items, show_decoding_notes,
+)
+from cascade import draft_sizes
+from batch import BATCH_STAGES, DOWNLOAD_WORKERS, TRANSCRIBE_WORKERS, run_batch_job
+from pipeline import SUBTITLE_MODES, TASKS, YOUTUBE_STAGES, cached_youtube_result, can_stream, run_youtube_job
+from utils import validate_youtube_url
+from workspace import QuotaExceeded, start_collector, workspaces
 import base64
 import pathlib
-import re
 
 st.set_page_config(page_title="Auto Subtitled Video Generator", page_icon=":movie_camera:", layout="wide")
 
-torch.cuda.is_available()
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-# Model options: tiny, base, small, medium, large
-loaded_model = whisper.load_model("small", device=DEVICE)
-current_size = "None"
-
-
+start_warmup()
+start_collector()
 
 # Define a function that we can use to load lottie files from a link.
 def load_lottieurl(url: str):
@@ -35,14 +30,6 @@ def load_lottieurl(url: str):
         return None
     return r.json()
 
-APP_DIR = pathlib.Path(__file__).parent.absolute()
-
-LOCAL_DIR = APP_DIR / "local_youtube"
-LOCAL_DIR.mkdir(exist_ok=True)
-save_dir = LOCAL_DIR / "output"
-save_dir.mkdir(exist_ok=True)
-
-
 
 col1, col2 = st.columns([1, 3])
 with col1:
@@ -55,140 +42,14 @@ with col2:
     ##### Input a YouTube video link and get a video with subtitles.
     ###### ➠ If you want to transcribe the video in its original language, select the task as "Transcribe"
     ###### ➠ If you want to translate the subtitles to English, select the task as "Translate" 
+    ###### ➠ If you want both the original subtitles and an English translation, select the task as "Transcribe + Translate"
     ###### I recommend starting with the base model and then experimenting with the larger models, the small and medium models often work well. """)
 
 
-def validate_youtube_url(url):
-    # Remove any whitespace
-    url = url.strip()
-    
-    # Handle direct video IDs
-    if len(url) == 11 and all(c.isalnum() or c in '-_' for c in url):
-        return f"https://www.youtube.com/watch?v={url}"
-    
-    # Handle various YouTube URL formats
-    patterns = [
-        r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([^&]+)',
-        r'(?:https?://)?(?:www\.)?youtube\.com/embed/([^/?]+)',
-        r'(?:https?://)?(?:www\.)?youtube\.com/v/([^/?]+)',
-        r'(?:https?://)?(?:www\.)?youtu\.be/([^/?]+)',
-        r'(?:https?://)?(?:www\.)?youtube\.com/shorts/([^/?]+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            video_id = match.group(1)
-            # Validate video ID format
-            if len(video_id) == 11 and all(c.isalnum() or c in '-_' for c in video_id):
-                return f"https://www.youtube.com/watch?v={video_id}"
-    
-    return None
-
-def download_video(link):
-    try:
-        if not validate_youtube_url(link):
-            st.error("Invalid YouTube URL. Please enter a valid YouTube video link or video ID.")
-            return None
-            
-        # Configure yt-dlp options
-        ydl_opts = {
-            'format': 'best[ext=mp4]',
-            'outtmpl': os.path.join(save_dir, 'youtube_video.mp4'),
-            'quiet': True,
-            'no_warnings': True,
-            'progress_hooks': [lambda d: st.progress(float(re.sub(r'\x1b\[[0-9;]*[a-zA-Z]', '', d.get('_percent_str', '0%')).strip('%')) / 100 if '_percent_str' in d else 0)],
-        }
-        
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([link])
-            return os.path.join(save_dir, 'youtube_video.mp4')
-        except Exception as e:
-            st.error(f"Error downloading video: {str(e)}")
-            return None
-            
-    except Exception as e:
-        st.error(f"An error occurred while downloading the video: {str(e)}")
-        return None
-
-
 def convert(seconds):
     return time.strftime("%H:%M:%S", time.gmtime(seconds))
 
 
-def change_model(current_size, size):
-    if current_size != size:
-        loaded_model = whisper.load_model(size)
-        return loaded_model
-    else:
-        raise Exception("Model size is the same as the current size.")
-
-
-def inference(link, loaded_model, task):
-    try:
-        if not validate_youtube_url(link):
-            st.error("Invalid YouTube URL. Please enter a valid YouTube video link or video ID.")
-            return None
-            
-        # Configure yt-dlp options for audio
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': os.path.join(save_dir, 'audio.mp3'),
-            'quiet': True,
-            'no_warnings': True,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'progress_hooks': [lambda d: st.progress(float(re.sub(r'\x1b\[[0-9;]*[a-zA-Z]', '', d.get('_percent_str', '0%')).strip('%')) / 100 if '_percent_str' in d else 0)],
-        }
-        
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([link])
-            path = os.path.join(save_dir, 'audio.mp3')
-            
-            if task == "Transcribe":
-                options = dict(task="transcribe", best_of=5)
-                results = loaded_model.transcribe(path, **options)
-                vtt = getSubs(results["segments"], "vtt", 80)
-                srt = getSubs(results["segments"], "srt", 80)
-                lang = results["language"]
-                return results["text"], vtt, srt, lang
-            elif task == "Translate":
-                options = dict(task="translate", best_of=5)
-                results = loaded_model.transcribe(path, **options)
-                vtt = getSubs(results["segments"], "vtt", 80)
-                srt = getSubs(results["segments"], "srt", 80)
-                lang = results["language"]
-                return results["text"], vtt, srt, lang
-            else:
-                raise ValueError("Task not supported")
-        except Exception as e:
-            st.error(f"Error processing audio: {str(e)}")
-            return None
-            
-    except Exception as e:
-        st.error(f"An error occurred during processing: {str(e)}")
-        return None
-
-
-def getSubs(segments: Iterator[dict], format: str, maxLineWidth: int) -> str:
-    segmentStream = StringIO()
-
-    if format == 'vtt':
-        write_vtt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
-    elif format == 'srt':
-        write_srt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
-    else:
-        raise Exception("Unknown format " + format)
-
-    segmentStream.seek(0)
-    return segmentStream.read()
-
-
 def get_language_code(language):
     if language in LANGUAGES.keys():
         detected_language = LANGUAGES[language]
@@ -197,19 +58,50 @@ def get_language_code(language):
         raise ValueError("Language not supported")
 
 
-def generate_subtitled_video(video, audio, transcript):
-    video_file = ffmpeg.input(video)
-    audio_file = ffmpeg.input(audio)
-    ffmpeg.concat(video_file.filter("subtitles", transcript), audio_file, v=1, a=1).output("youtube_sub.mp4").run(quiet=True, overwrite_output=True)
-    video_with_subs = open("youtube_sub.mp4", "rb")
-    return video_with_subs        
-    
+def show_results(results):
+    detected_language = get_language_code(results["language"])
+    show_decoding_notes(results)
+
+    col3, col4 = st.columns(2)
+    with col3:
+        st.video(results["video"])
+    with col4:
+        st.video(results["subtitled_video"], subtitles=player_subtitles(results))
+
+    ZipfileDotZip = pathlib.Path(results["zip"]).name
+    with open(results["zip"], "rb") as f:
+        datazip = f.read()
+        b64 = base64.b64encode(datazip).decode()
+        href = f"<a href=\"data:file/zip;base64,{b64}\" download='{ZipfileDotZip}'>\
+        Download Transcripts and Video\
+    </a>"
+    st.markdown(href, unsafe_allow_html=True)
+
+
+def show_batch_results(results):
+    summary = results["summary"]
+    st.write(
+        f"{summary['done']} of {summary['total']} videos subtitled, {summary['failed']} failed, "
+        f"in {convert(summary['elapsed_seconds'])}: {summary['videos_per_hour']:.1f} videos/hour, "
+        f"{summary['audio_hours_per_hour']:.2f} audio-hours/hour."
+    )
+    show_batch_items(results["items"])
+    for item in results["items"]:
+        if item["zip"]:
+            with open(item["zip"], "rb") as f:
+                st.download_button(f"Download {item['id']}", f.read(), file_name=f"{item['id']}.zip", key=f"batch-{item['id']}")
+
 
 def main():
     size = st.selectbox("Select Model Size (The larger the model, the more accurate the transcription will be, but it will take longer)", ["tiny", "base", "small", "medium", "large-v3"], index=1)
-    loaded_model = change_model(current_size, size)
-    st.write(f"Model is {'multilingual' if loaded_model.is_multilingual else 'English-only'} "
-        f"and has {sum(np.prod(p.shape) for p in loaded_model.parameters()):,} parameters.")
+    precision = st.selectbox("Select Precision (int8 and bf16 run faster on CPU at a small cost in accuracy)", supported_precisions(), index=0)
+    # Don't block the first render on a cold model; it is loaded on submit.
+    if registry.is_loaded(size, precision=precision):
+        loaded_model = get_model(size, precision=precision)
+        st.write(f"Model is {'multilingual' if loaded_model.is_multilingual else 'English-only'} "
+            f"and has {sum(np.prod(p.shape) for p in loaded_model.parameters()):,} parameters.")
+    else:
+        st.caption(f"The {size} model will be loaded when the first job starts.")
     
     link = st.text_input("YouTube Link (The longer the video, the longer the processing time)", 
                         placeholder="Enter YouTube URL or video ID (e.g., https://youtube.com/watch?v=VIDEO_ID or VIDEO_ID)",
@@ -220,145 +112,94 @@ def main():
                         - Embed URL: https://youtube.com/embed/VIDEO_ID
                         - Shorts URL: https://youtube.com/shorts/VIDEO_ID""")
     
-    task = st.selectbox("Select Task", ["Transcribe", "Translate"], index=0)
+    task = st.selectbox("Select Task", list(TASKS), index=0)
+    profile = st.selectbox("Select Decoding Profile (adaptive decodes greedily and re-decodes only the doubtful segments)", list(PROFILES), index=1)
+    drafts = draft_sizes(size)
+    cascade = st.checkbox("Cascade mode: draft with a small model and re-decode only low-confidence segments with the selected size",
+                          disabled=task == "Transcribe + Translate" or not drafts)
+    draft_size = st.selectbox("Select Draft Model Size", drafts, index=len(drafts) - 1) if cascade and drafts else None
+    vad = st.checkbox("Skip silence and music before decoding", value=False)
+    stream = st.checkbox("Transcribe while downloading", value=False,
+                         disabled=not can_stream(task, draft_size, vad),
+                         help="Starts on the first 30 seconds of audio instead of after the whole download; "
+                              "not available with cascade mode, silence skipping or Transcribe + Translate")
+    subtitle_mode = SUBTITLE_MODES[st.radio("Subtitles", list(SUBTITLE_MODES), index=0, horizontal=True,
+                                            help="A subtitle track can be switched on and off in the player and is ready in seconds; "
+                                                 "burning them in re-encodes the whole video")]
     
-    if task == "Transcribe":
-        if st.button("Transcribe"):
-            if not link:
-                st.error("Please enter a YouTube link or video ID")
-                return
-                
-            # Validate URL before proceeding
-            proper_url = validate_youtube_url(link)
-            if not proper_url:
-                st.error("""Invalid YouTube URL. Please enter a valid YouTube link in one of these formats:
-                - Full URL: https://youtube.com/watch?v=VIDEO_ID
-                - Short URL: https://youtu.be/VIDEO_ID
-                - Video ID: VIDEO_ID
-                - Embed URL: https://youtube.com/embed/VIDEO_ID
-                - Shorts URL: https://youtube.com/shorts/VIDEO_ID""")
+    if st.button(BUTTON_LABELS[task]):
+        if not link:
+            st.error("Please enter a YouTube link or video ID")
+            return
+            
+        # Validate URL before proceeding
+        proper_url = validate_youtube_url(link)
+        if not proper_url:
+            st.error("""Invalid YouTube URL. Please enter a valid YouTube link in one of these formats:
+            - Full URL: https://youtube.com/watch?v=VIDEO_ID
+            - Short URL: https://youtu.be/VIDEO_ID
+            - Video ID: VIDEO_ID
+            - Embed URL: https://youtube.com/embed/VIDEO_ID
+            - Shorts URL: https://youtube.com/shorts/VIDEO_ID""")
+            return
+
+        job_id = new_job_id()
+        try:
+            workspace = workspaces.create("youtube", job_id)
+        except QuotaExceeded as e:
+            st.error(str(e))
+            return
+        params = {"link": proper_url, "size": size, "task": task, "precision": precision, "profile": profile,
+                  "draft_size": draft_size, "vad": vad, "stream": stream, "subtitle_mode": subtitle_mode}
+        # A video already processed with the same options is served without a download or a model;
+        # streaming only changes how the job runs, not its result.
+        cached = cached_youtube_result(workspace, **{name: value for name, value in params.items() if name != "stream"})
+        if cached is not None:
+            get_manager().record("youtube", params, cached, YOUTUBE_STAGES, job_id=job_id)
+        else:
+            get_manager().submit("youtube", run_youtube_job, params, YOUTUBE_STAGES, job_id=job_id)
+        remember_job("youtube", job_id)
+
+    # The job runs in the background; a rerun or reload reattaches to it.
+    job = current_job("youtube")
+    if job and job_finished(job):
+        show_results(job["result"])
+        if st.session_state.get("celebrated") != job["id"]:
+            st.session_state["celebrated"] = job["id"]
+            st.balloons()
+
+    with st.expander("Batch: subtitle a playlist, a channel or a list of videos"):
+        lines = st.text_area("One video link, video ID, playlist or channel URL per line")
+        col1, col2 = st.columns(2)
+        with col1:
+            download_workers = st.number_input("Concurrent downloads", min_value=1, max_value=8, value=DOWNLOAD_WORKERS)
+        with col2:
+            transcribe_workers = st.number_input("Transcription workers", min_value=1, max_value=4, value=TRANSCRIBE_WORKERS)
+        if st.button("Start batch"):
+            if not lines.strip():
+                st.error("Please enter at least one link")
                 return
-                
-            with st.spinner("Transcribing the video..."):
-                results = inference(proper_url, loaded_model, task)
-                if not results:
-                    return
-                    
-            video = download_video(proper_url)
-            if not video:
+            job_id = new_job_id()
+            try:
+                workspaces.create("batch", job_id)
+            except QuotaExceeded as e:
+                st.error(str(e))
                 return
-                
-            lang = results[3]
-            detected_language = get_language_code(lang)
-                
-            col3, col4 = st.columns(2)
-            with col3:
-                st.video(video)
-            
-            # Split result["text"]  on !,? and . , but save the punctuation
-            sentences = re.split("([!?.])", results[0])
-            # Join the punctuation back to the sentences
-            sentences = ["".join(i) for i in zip(sentences[0::2], sentences[1::2])]
-            text = "\n\n".join(sentences)
-            with open("transcript.txt", "w+", encoding='utf8') as f:
-                f.writelines(text)
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.txt"), "rb") as f:
-                datatxt = f.read()
-                
-            with open("transcript.vtt", "w+",encoding='utf8') as f:
-                f.writelines(results[1])
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.vtt"), "rb") as f:
-                datavtt = f.read()
-                
-            with open("transcript.srt", "w+",encoding='utf8') as f:
-                f.writelines(results[2])
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.srt"), "rb") as f:
-                datasrt = f.read()
-  
-            with col4:
-                with st.spinner("Generating Subtitled Video"):
-                    video_with_subs = generate_subtitled_video(video, f"{save_dir}/audio.mp3", "transcript.srt")
-                st.video(video_with_subs)
-                st.balloons()
-
-            zipObj = ZipFile("YouTube_transcripts_and_video.zip", "w")
-            zipObj.write("transcript.txt")
-            zipObj.write("transcript.vtt")
-            zipObj.write("transcript.srt")
-            zipObj.write("youtube_sub.mp4")
-            zipObj.close()
-            ZipfileDotZip = "YouTube_transcripts_and_video.zip"
-            with open(ZipfileDotZip, "rb") as f:
-                datazip = f.read()
-                b64 = base64.b64encode(datazip).decode()
-                href = f"<a href=\"data:file/zip;base64,{b64}\" download='{ZipfileDotZip}'>\
-        Download Transcripts and Video\
-    </a>"
-            st.markdown(href, unsafe_allow_html=True)
-            
-    elif task == "Translate":
-        if st.button("Translate to English"):
-            with st.spinner("Translating to English..."):
-                results = inference(link, loaded_model, task)
-            video = download_video(link)
-            lang = results[3]
-            detected_language = get_language_code(lang)
-                
-            col3, col4 = st.columns(2)
-            with col3:
-                st.video(video)
-                
-            # Split result["text"]  on !,? and . , but save the punctuation
-            sentences = re.split("([!?.])", results[0])
-            # Join the punctuation back to the sentences
-            sentences = ["".join(i) for i in zip(sentences[0::2], sentences[1::2])]
-            text = "\n\n".join(sentences)
-            with open("transcript.txt", "w+", encoding='utf8') as f:
-                f.writelines(text)
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.txt"), "rb") as f:
-                datatxt = f.read()
-                
-            with open("transcript.vtt", "w+",encoding='utf8') as f:
-                f.writelines(results[1])
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.vtt"), "rb") as f:
-                datavtt = f.read()
-                
-            with open("transcript.srt", "w+",encoding='utf8') as f:
-                f.writelines(results[2])
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.srt"), "rb") as f:
-                datasrt = f.read()
-                       
-            with col4:
-                with st.spinner("Generating Subtitled Video"):
-                    video_with_subs = generate_subtitled_video(video, f"{save_dir}/audio.mp3", "transcript.srt")
-                st.video(video_with_subs)
-                st.balloons()
-            
-            zipObj = ZipFile("YouTube_transcripts_and_video.zip", "w")
-            zipObj.write("transcript.txt")
-            zipObj.write("transcript.vtt")
-            zipObj.write("transcript.srt")
-            zipObj.write("youtube_sub.mp4")
-            zipObj.close()
-            ZipfileDotZip = "YouTube_transcripts_and_video.zip"
-            with open(ZipfileDotZip, "rb") as f:
-                datazip = f.read()
-                b64 = base64.b64encode(datazip).decode()
-                href = f"<a href=\"data:file/zip;base64,{b64}\" download='{ZipfileDotZip}'>\
-        Download Transcripts and Video\
-    </a>"
-            st.markdown(href, unsafe_allow_html=True)
-            
-    else:
-        st.info("Please select a task.")
+            get_manager().submit(
+                "batch",
+                run_batch_job,
+                {"lines": lines.splitlines(), "size": size, "task": task, "precision": precision, "profile": profile,
+                 "vad": vad, "download_workers": int(download_workers), "transcribe_workers": int(transcribe_workers),
+                 "subtitle_mode": subtitle_mode},
+                BATCH_STAGES,
+                job_id=job_id,
+            )
+            remember_job("batch", job_id)
+
+        batch = current_job("batch")
+        if batch and job_finished(batch):
+            show_batch_results(batch["result"])
 
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
@@ -0,0 +1,231 @@
+import os
+import queue
+from urllib.parse import parse_qs, urlparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yt_dlp
+from whisper.audio import SAMPLE_RATE
+
+from pipeline import decode_audio, download_video, finish_youtube_video, transcribe, youtube_cache_key, youtube_outputs
+from utils import validate_youtube_url
+from workspace import workspaces
+from youtube_cache import youtube_cache
+
+BATCH_STAGES = ["expand", "process"]
+
+# Concurrent downloads feeding the transcription workers.
+DOWNLOAD_WORKERS = int(os.environ.get("ANUVADIKA_BATCH_DOWNLOAD_WORKERS", "3"))
+# Transcription workers. Jobs on the same model size share one model and
+# serialize on it, so more than one mostly helps across different sizes or on GPU.
+TRANSCRIBE_WORKERS = int(os.environ.get("ANUVADIKA_BATCH_TRANSCRIBE_WORKERS", "1"))
+# Extra attempts for each item's download and processing before it is marked failed.
+RETRIES = int(os.environ.get("ANUVADIKA_BATCH_RETRIES", "2"))
+RETRY_BACKOFF_SECONDS = 5.0
+
+PENDING = "pending"
+DOWNLOADING = "downloading"
+DOWNLOADED = "downloaded"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+
+def _playlist_entries(url, depth=0):
+    """Video URLs of a playlist or channel, following nested tabs one level down."""
+    ydl_opts = {"extract_flat": True, "quiet": True, "no_warnings": True}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    links = []
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        link = validate_youtube_url(entry.get("id") or "")
+        if link:
+            links.append(link)
+        elif entry.get("url") and depth < 1:
+            links += _playlist_entries(entry["url"], depth + 1)
+    return links
+
+
+def expand_links(lines):
+    """
+    Turn video links, bare IDs, playlist and channel URLs into a list of
+    canonical video links, in order and without duplicates.
+    """
+    links = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        playlist = parse_qs(urlparse(line).query).get("list")
+        if playlist:
+            # watch?v=ID&list=PL... is how most playlist links are copied; it means the whole list.
+            links += _playlist_entries(f"https://www.youtube.com/playlist?list={playlist[0]}")
+            continue
+        link = validate_youtube_url(line)
+        if link is None and ("list=" in line or "/@" in line or "/channel/" in line or "/c/" in line or "/user/" in line):
+            links += _playlist_entries(line)
+        elif link is None:
+            raise ValueError(f"Not a YouTube video, playlist or channel: {line}")
+        else:
+            links.append(link)
+    return list(dict.fromkeys(links))
+
+
+def _retry(item, fn, retries):
+    """Run ``fn``, retrying with backoff; the last error is re-raised."""
+    for attempt in range(retries + 1):
+        item["attempts"] += 1
+        try:
+            return fn()
+        except Exception as e:
+            item["error"] = str(e)
+            if attempt == retries:
+                raise
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+
+class BatchRun:
+    """
+    A producer/consumer pipeline over many videos: a bounded pool of
+    downloads fills a bounded queue that transcription workers drain, so the
+    network and the model are busy at the same time. Item status is
+    published on the job as it changes.
+    """
+
+    def __init__(self, job, links, out_dir, size, task, download_workers=DOWNLOAD_WORKERS,
+                 transcribe_workers=TRANSCRIBE_WORKERS, retries=RETRIES, subtitle_mode="soft", **options):
+        self.job = job
+        self.out_dir = out_dir
+        self.size = size
+        self.task = task
+        self.subtitle_mode = subtitle_mode
+        self.options = options
+        self.download_workers = download_workers
+        self.transcribe_workers = transcribe_workers
+        self.retries = retries
+        self.items = [
+            {"link": link, "id": youtube_cache_key(link, size, task, subtitle_mode=subtitle_mode, **options)[0], "status": PENDING,
+             "attempts": 0, "error": None, "audio_seconds": 0.0, "zip": None, "srt": None}
+            for link in links
+        ]
+        self._lock = threading.Lock()
+        self._started = None
+        self.outputs = []
+
+    def _set(self, item, **fields):
+        with self._lock:
+            item.update(fields)
+            finished = sum(1 for i in self.items if i["status"] in (DONE, FAILED))
+            self.job.report("process", finished / len(self.items), done=finished, unit="videos")
+            self.job.publish({"batch": True, "items": self.items, "summary": self.summary()})
+
+    def _download(self, item):
+        item_dir = self.out_dir / item["id"]
+        item_dir.mkdir(exist_ok=True)
+        video_id, key = youtube_cache_key(item["link"], self.size, self.task, subtitle_mode=self.subtitle_mode, **self.options)
+        self._set(item, status=DOWNLOADING)
+        cached = youtube_cache.get_result(key, video_id, item_dir)
+        if cached is not None:
+            return item_dir, None, cached
+
+        def fetch():
+            video = youtube_cache.get_media(video_id, item_dir)
+            if video is None:
+                video = download_video(item["link"], item_dir)
+                youtube_cache.put_media(video_id, video)
+            return video
+
+        video = _retry(item, fetch, self.retries)
+        self._set(item, status=DOWNLOADED)
+        return item_dir, video, key
+
+    def _process(self, item, item_dir, video, key):
+        self._set(item, status=PROCESSING)
+
+        def run():
+            pcm = decode_audio(video)
+            results = transcribe(self.size, pcm, self.task, **self.options)
+            result = finish_youtube_video(video, item_dir, results, len(pcm) / SAMPLE_RATE, subtitle_mode=self.subtitle_mode,
+                                          task=self.task)
+            youtube_cache.put_result(key, result)
+            return result
+
+        return _retry(item, run, self.retries)
+
+    def _producer(self, work: queue.Queue):
+        def fetch(item):
+            try:
+                work.put((item, *self._download(item)))
+            except Exception as e:
+                self._set(item, status=FAILED, error=str(e))
+
+        with ThreadPoolExecutor(self.download_workers, thread_name_prefix="batch-download") as pool:
+            list(pool.map(fetch, self.items))
+        for _ in range(self.transcribe_workers):
+            work.put(None)
+
+    def _consumer(self, work: queue.Queue):
+        while (task := work.get()) is not None:
+            item, item_dir, video, key_or_result = task
+            try:
+                if video is None:
+                    # Served from the YouTube cache.
+                    result = key_or_result
+                else:
+                    result = self._process(item, item_dir, video, key_or_result)
+            except Exception as e:
+                self._set(item, status=FAILED, error=str(e))
+            else:
+                with self._lock:
+                    self.outputs += youtube_outputs(result)
+                self._set(item, status=DONE, error=None, zip=result["zip"], srt=result["srt"],
+                          audio_seconds=result.get("duration", 0.0))
+
+    def run(self):
+        self._started = time.perf_counter()
+        # Bounded so downloads stay at most a few videos ahead of the model.
+        work = queue.Queue(maxsize=self.download_workers)
+        consumers = [threading.Thread(target=self._consumer, args=(work,), name=f"batch-transcribe-{i}")
+                     for i in range(self.transcribe_workers)]
+        for consumer in consumers:
+            consumer.start()
+        self._producer(work)
+        for consumer in consumers:
+            consumer.join()
+        return {"batch": True, "items": self.items, "summary": self.summary()}
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        done = [item for item in self.items if item["status"] == DONE]
+        audio_hours = sum(item["audio_seconds"] for item in done) / 3600
+        hours = elapsed / 3600
+        return {
+            "total": len(self.items),
+            "done": len(done),
+            "failed": sum(1 for item in self.items if item["status"] == FAILED),
+            "elapsed_seconds": elapsed,
+            "videos_per_hour": len(done) / hours if hours else 0.0,
+            "audio_hours_per_hour": audio_hours / hours if hours else 0.0,
+        }
+
+
+def run_batch_job(job, lines, size, task, precision="fp32", profile="balanced", vad=False,
+                  download_workers=DOWNLOAD_WORKERS, transcribe_workers=TRANSCRIBE_WORKERS, retries=RETRIES,
+                  subtitle_mode="soft"):
+    workspace = workspaces.get("batch", job.id)
+    out_dir = workspace.dir
+
+    job.report("expand")
+    links = expand_links(lines)
+    if not links:
+        raise ValueError("No videos found")
+
+    job.report("process")
+    batch = BatchRun(job, links, out_dir, size, task, download_workers, transcribe_workers, retries, subtitle_mode,
+                     precision=precision, profile=profile, vad=vad)
+    result = batch.run()
+    workspaces.finalize(workspace, batch.outputs)
+    return result
@@ -0,0 +1,74 @@
+"""
+Latency and peak RSS of the audio decode stage, before and after the
+single-process path.
+
+before: ffmpeg writes output.wav, then whisper.load_audio decodes it again.
+after:  pipeline.decode_audio reads s16le straight from one ffmpeg process.
+
+Each path runs in its own process so peak RSS is not shared between them.
+
+    python benchmarks/bench_decode.py upload.mp4 --repeat 3
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def before(path):
+    import ffmpeg
+    import whisper
+    from pipeline import run_ffmpeg
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wav = os.path.join(tmp, "output.wav")
+        run_ffmpeg(ffmpeg.input(path).output(wav, acodec="pcm_s16le", ac=1, ar="16k"))
+        return whisper.load_audio(wav)
+
+
+def after(path):
+    from pipeline import decode_audio
+
+    return decode_audio(path)
+
+
+def run(name, path, repeat, queue):
+    decode = {"before": before, "after": after}[name]
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        audio = decode(path)
+        seconds.append(time.perf_counter() - start)
+        del audio
+    # ru_maxrss is reported in KiB on Linux; ffmpeg shows up under the children.
+    queue.put({
+        "seconds": min(seconds),
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "ffmpeg_peak_rss": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="uploaded video or audio file")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'path':>8} {'seconds':>8} {'peak RSS (MB)':>14} {'ffmpeg RSS (MB)':>16}")
+    for name in ("before", "after"):
+        queue = context.Queue()
+        process = context.Process(target=run, args=(name, args.path, args.repeat, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        print(f"{name:>8} {result['seconds']:>8.2f} {result['peak_rss'] / 2**20:>14.0f} {result['ffmpeg_peak_rss'] / 2**20:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Wall time of long-audio transcription against the number of worker processes.
+
+Run on the multi-core box you deploy to, e.g.:
+
+    python benchmarks/bench_parallel_transcribe.py lecture.mp3 --size base --workers 1,2,4,8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+import whisper
+
+from parallel_transcribe import TranscriptionPool
+from whisper.audio import SAMPLE_RATE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio", help="audio or video file to transcribe")
+    parser.add_argument("--size", default="base")
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--window", type=float, default=240.0, help="window length in seconds")
+    parser.add_argument("--overlap", type=float, default=8.0, help="window overlap in seconds")
+    args = parser.parse_args()
+
+    audio = whisper.load_audio(args.audio)
+    duration = len(audio) / SAMPLE_RATE
+    options = dict(task="transcribe", best_of=5, language="en")
+    print(f"audio: {duration:.1f}s, cores: {os.cpu_count()}, model: {args.size}")
+
+    # Baseline: one process using every core, as the pages did before.
+    torch.set_num_threads(os.cpu_count() or 1)
+    model = whisper.load_model(args.size, device="cpu")
+    start = time.perf_counter()
+    model.transcribe(audio, **options)
+    baseline = time.perf_counter() - start
+    del model
+    print(f"{'workers':>8} {'threads':>8} {'wall (s)':>10} {'RTF':>7} {'speedup':>8}")
+    print(f"{'inline':>8} {os.cpu_count():>8} {baseline:>10.1f} {baseline / duration:>7.3f} {1.0:>8.2f}")
+
+    for workers in (int(w) for w in args.workers.split(",")):
+        pool = TranscriptionPool(args.size, workers)
+        # Load the models before timing; a server keeps its pool warm.
+        pool.warm()
+        start = time.perf_counter()
+        pool.transcribe(audio, window_seconds=args.window, overlap_seconds=args.overlap, **options)
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+        print(f"{workers:>8} {pool.threads_per_worker:>8} {elapsed:>10.1f} {elapsed / duration:>7.3f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Realtime factor, peak RSS and WER drift of each CPU precision mode.
+
+Every precision runs in its own process so peak RSS is not polluted by the
+other modes. WER is measured against a ``<audio>.txt`` reference when one
+exists next to the audio file, otherwise against the fp32 transcript (drift).
+With ``--load-mode mmap`` the models are loaded memory-mapped, whose fp16
+weights are cast to fp32 on every CPU forward pass; compare it against the
+standard load to see what that costs per token.
+
+    python benchmarks/bench_precision.py clips/*.wav --size small
+    python benchmarks/bench_precision.py clips/*.wav --size small --load-mode mmap --precisions fp32
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
+from queue import Empty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def normalize(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def run_precision(size, precision, files, load_mode, queue):
+    # Read by model_registry at import time; this is a fresh spawned process.
+    os.environ["ANUVADIKA_MODEL_LOAD_MODE"] = load_mode
+    import torch
+    import whisper
+    from model_registry import decode_options_for, get_model, precision_context
+    from whisper.audio import SAMPLE_RATE
+
+    torch.set_num_threads(os.cpu_count() or 1)
+    model = get_model(size, device="cpu", precision=precision)
+    texts, seconds, duration = {}, 0.0, 0.0
+    for path in files:
+        audio = whisper.load_audio(path)
+        duration += len(audio) / SAMPLE_RATE
+        start = time.perf_counter()
+        with precision_context(model):
+            result = model.transcribe(audio, task="transcribe", best_of=5, **decode_options_for(model))
+        seconds += time.perf_counter() - start
+        texts[path] = result["text"]
+    # ru_maxrss is reported in KiB on Linux.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    queue.put({"texts": texts, "rtf": seconds / duration, "peak_rss": peak_rss})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="fixed audio set to transcribe")
+    parser.add_argument("--size", default="small")
+    parser.add_argument("--precisions", default="fp32,int8,bf16")
+    parser.add_argument("--load-mode", default="standard", choices=["standard", "mmap"])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for precision in args.precisions.split(","):
+        queue = context.Queue()
+        process = context.Process(target=run_precision, args=(args.size, precision, args.files, args.load_mode, queue))
+        process.start()
+        # Poll so a child that crashes (e.g. an unsupported precision) is reported instead of hanging.
+        while True:
+            try:
+                results[precision] = queue.get(timeout=5)
+                break
+            except Empty:
+                if not process.is_alive() and queue.empty():
+                    break
+        process.join()
+        if precision not in results:
+            print(f"{precision}: worker exited with code {process.exitcode}", file=sys.stderr)
+
+    references = {}
+    for path in args.files:
+        reference = path + ".txt"
+        if os.path.exists(reference):
+            with open(reference, encoding="utf-8") as f:
+                references[path] = f.read()
+        elif "fp32" in results:
+            references[path] = results["fp32"]["texts"][path]
+
+    print(f"load mode: {args.load_mode}")
+    print(f"{'precision':>10} {'RTF':>7} {'peak RSS (MB)':>14} {'WER':>7}")
+    for precision, result in results.items():
+        wers = [word_error_rate(references[p], result["texts"][p]) for p in args.files if p in references]
+        wer = sum(wers) / len(wers) if wers else float("nan")
+        print(f"{precision:>10} {result['rtf']:>7.3f} {result['peak_rss'] / 2**20:>14.0f} {wer:>7.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Wall time of a hard subtitle burn against the number of segments.
+
+1 is the single ffmpeg process the pages used before; higher counts split
+the video at keyframes and burn the segments side by side. Run on the
+encode box you deploy to, with a long input, e.g.:
+
+    python benchmarks/bench_segmented_burn.py lecture_1080p.mp4 transcript.srt --segments 1,2,4,8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import BURN_STYLE, burn_subtitles_segmented, probe_duration
+from segments import keyframe_times, plan_segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="video to burn the subtitles into")
+    parser.add_argument("transcript", help=".srt or .vtt file")
+    parser.add_argument("--segments", default="1,2,4,8", help="comma separated segment counts")
+    args = parser.parse_args()
+
+    duration = probe_duration(args.video)
+    keyframes = keyframe_times(args.video)
+    print(f"video: {duration:.1f}s, {len(keyframes)} keyframes, cores: {os.cpu_count()}")
+    print(f"{'segments':>8} {'planned':>8} {'seconds':>8} {'speedup':>8} {'x realtime':>10}")
+
+    baseline = None
+    for count in (int(n) for n in args.segments.split(",")):
+        planned = len(plan_segments(keyframes, duration, count))
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            burn_subtitles_segmented(args.video, args.transcript, os.path.join(tmp, "burned.mp4"),
+                                     segments=count, style=BURN_STYLE)
+            seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(f"{count:>8} {planned:>8} {seconds:>8.2f} {baseline / seconds:>7.2f}x {duration / seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
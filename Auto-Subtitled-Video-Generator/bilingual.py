@@ -0,0 +1,60 @@
+import whisper
+
+from decoding import decode_with_fallback, split_timestamps
+from streaming import MAX_PROMPT_TOKENS, STREAM_PROFILES, TranscriptStream
+
+
+class BilingualStream(TranscriptStream):
+    """
+    A ``TranscriptStream`` that also translates every window to English.
+
+    The mel spectrogram and the encoder output of each 30 s window are
+    computed once and both decoders run off the same audio features, so the
+    cost is one encoder pass plus two decoder passes. Window boundaries follow
+    the transcription; translated spans past the boundary are dropped, and
+    silent windows are not translated at all. Iterating yields the transcript
+    segments; the translation is collected alongside.
+    """
+
+    def __init__(self, model, audio, language=None, profile="balanced", fp16=None):
+        super().__init__(model, audio, "transcribe", language=language, profile=profile, fp16=fp16)
+        self.translation = []
+        self._translation_prompt = []
+
+    def _window_decoded(self, features, seek, segment_frames, consumed):
+        base_options, temperatures = STREAM_PROFILES[self.profile]
+        options = whisper.DecodingOptions(
+            task="translate", language=self.language, fp16=self.fp16,
+            prompt=self._translation_prompt[-MAX_PROMPT_TOKENS:] or None, **base_options,
+        )
+        with self._lock:
+            result = decode_with_fallback(self.model, features, options, temperatures)
+        spans, _ = split_timestamps(result.tokens, self.tokenizer.timestamp_begin)
+        if consumed is not None:
+            spans = [span for span in spans if span[0] < consumed]
+        self.translation.extend(self._segments(result, spans, seek, segment_frames, "translate", len(self.translation)))
+        self._translation_prompt = self._next_prompt(self._translation_prompt, result)
+
+    def result(self) -> dict:
+        result = super().result()
+        result["translation"] = {
+            "text": "".join(segment["text"] for segment in self.translation),
+            "segments": self.translation,
+            "language": self.language,
+        }
+        return result
+
+
+def transcribe_and_translate(model, audio, language=None, profile="balanced", fp16=None, on_segment=None):
+    """
+    Transcribe and translate to English in one pass over the audio.
+
+    Returns a ``transcribe()``-shaped result with the English translation
+    under ``"translation"``. ``on_segment`` is called with each transcript
+    segment as soon as its window has been decoded.
+    """
+    stream = BilingualStream(model, audio, language=language, profile=profile, fp16=fp16)
+    for segment in stream:
+        if on_segment is not None:
+            on_segment(segment)
+    return stream.result()
@@ -0,0 +1,112 @@
+import time
+
+from whisper.audio import SAMPLE_RATE
+
+from decoding import LOGPROB_THRESHOLD, fallback_summary, transcribe_with_profile
+from model_registry import decode_options_for, inference_lock, precision_context
+from streaming import TranscriptStream
+
+# Draft segments below this average log-prob are re-decoded by the final model.
+ESCALATE_LOGPROB = -0.6
+# ...as are segments the draft model thinks may not be speech at all.
+ESCALATE_NO_SPEECH = 0.4
+# Escalated segments closer than this are re-decoded as one range, for context.
+MERGE_GAP_SECONDS = 2.0
+
+# Model sizes from smallest to largest, and those offered as drafts.
+SIZE_ORDER = ("tiny", "base", "small", "medium", "large")
+DRAFT_SIZES = ("tiny", "base")
+
+
+def _rank(size: str) -> int:
+    # "base.en" and "large-v3" rank with "base" and "large".
+    return SIZE_ORDER.index(size.split(".")[0].split("-")[0])
+
+
+def draft_sizes(size: str):
+    """Draft sizes that are smaller than ``size``; a draft as large as the final model saves nothing."""
+    return [draft for draft in DRAFT_SIZES if _rank(draft) < _rank(size)]
+
+
+def should_escalate(segment) -> bool:
+    return segment["avg_logprob"] < ESCALATE_LOGPROB or segment["no_speech_prob"] > ESCALATE_NO_SPEECH
+
+
+def escalation_ranges(segments, gap: float = MERGE_GAP_SECONDS):
+    """Merge the time ranges of segments that need escalating."""
+    ranges = []
+    for segment in segments:
+        if not should_escalate(segment):
+            continue
+        if ranges and segment["start"] - ranges[-1][1] <= gap:
+            ranges[-1][1] = max(ranges[-1][1], segment["end"])
+        else:
+            ranges.append([segment["start"], segment["end"]])
+    return [tuple(r) for r in ranges]
+
+
+def transcribe_cascade(draft_model, final_model, audio, task="transcribe", profile="balanced"):
+    """
+    Draft the whole file with a small model, then re-decode only the
+    low-confidence ranges with the large one and merge the two.
+
+    The draft is always decoded greedily; ``profile`` is the decoding profile
+    of the final model on the escalated ranges.
+
+    The result carries a ``cascade`` entry with the escalated fraction of the
+    audio and the estimated speedup over running the final model throughout,
+    extrapolated from its measured speed on the escalated ranges.
+    """
+    start_time = time.perf_counter()
+    with inference_lock(draft_model), precision_context(draft_model):
+        stream = TranscriptStream(draft_model, audio, task, profile="fast", **decode_options_for(draft_model))
+        draft = list(stream)
+    language = stream.language
+    draft_seconds = time.perf_counter() - start_time
+
+    ranges = escalation_ranges(draft)
+    escalated = {}
+    final_seconds = 0.0
+    if ranges:
+        final_start = time.perf_counter()
+        with inference_lock(final_model), precision_context(final_model):
+            for start, end in ranges:
+                clip = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+                result = transcribe_with_profile(
+                    final_model, clip, profile, task=task, language=language,
+                    logprob_threshold=LOGPROB_THRESHOLD, **decode_options_for(final_model),
+                )
+                for segment in result["segments"]:
+                    segment["start"] = min(segment["start"] + start, end)
+                    segment["end"] = min(segment["end"] + start, end)
+                    segment["escalated"] = True
+                escalated[(start, end)] = result["segments"]
+        final_seconds = time.perf_counter() - final_start
+
+    segments = []
+    for segment in draft:
+        inside = next((r for r in ranges if r[0] <= segment["start"] and segment["end"] <= r[1]), None)
+        if inside is None:
+            segments.append(segment)
+        elif inside in escalated:
+            segments.extend(escalated.pop(inside))
+    for i, segment in enumerate(segments):
+        segment["id"] = i
+
+    duration = len(audio) / SAMPLE_RATE
+    escalated_seconds = sum(end - start for start, end in ranges)
+    total_seconds = time.perf_counter() - start_time
+    estimated_full = final_seconds / escalated_seconds * duration if escalated_seconds else None
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+        "decoding": fallback_summary(segments, profile) if profile == "adaptive" else None,
+        "cascade": {
+            "escalated_fraction": escalated_seconds / duration if duration else 0.0,
+            "draft_seconds": draft_seconds,
+            "final_seconds": final_seconds,
+            "total_seconds": total_seconds,
+            "estimated_speedup": estimated_full / total_seconds if estimated_full else None,
+        },
+    }
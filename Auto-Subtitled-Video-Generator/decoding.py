@@ -0,0 +1,142 @@
+import dataclasses
+
+import whisper
+from whisper.audio import SAMPLE_RATE
+
+from utils import compression_ratio
+
+# Named transcribe() settings. "balanced" is what the pages always used.
+PROFILES = {
+    # Greedy decoding at temperature 0, never retried.
+    "fast": dict(temperature=0.0),
+    # Greedy first; a 30 s window that fails the thresholds is re-sampled with best_of=5.
+    "balanced": dict(best_of=5),
+    # Beam search on every window, with the same sampling fallback.
+    "accurate": dict(beam_size=5, best_of=5, patience=1.0),
+    # Greedy pass, then only the failing segments are re-decoded with beam search.
+    "adaptive": dict(temperature=0.0),
+}
+
+# Same defaults whisper uses to decide a decode has failed.
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+# Temperatures a failed window is re-sampled at, and the no-speech
+# probability above which a low-confidence window counts as silence.
+FALLBACK_TEMPERATURES = (0.2, 0.4, 0.6, 0.8, 1.0)
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def needs_fallback(segment) -> bool:
+    return (
+        compression_ratio(segment["text"]) > COMPRESSION_RATIO_THRESHOLD
+        or segment["avg_logprob"] < LOGPROB_THRESHOLD
+    )
+
+
+def redecode_segment(model, audio, segment, task, language, fp16):
+    """Decode one segment's time range again with beam search."""
+    start = int(segment["start"] * SAMPLE_RATE)
+    end = max(int(segment["end"] * SAMPLE_RATE), start + 1)
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio[start:end]), model.dims.n_mels).to(model.device)
+    options = whisper.DecodingOptions(
+        task=task, language=language, beam_size=5, without_timestamps=True, fp16=fp16
+    )
+    return whisper.decode(model, mel, options)
+
+
+def refine_segment(model, audio, segment, task, language, fp16):
+    """Adaptive fallback for one segment: re-decode it if it looks unreliable."""
+    segment["fallback"] = needs_fallback(segment)
+    if not segment["fallback"]:
+        return segment
+    decoded = redecode_segment(model, audio, segment, task, language, fp16)
+    if decoded.avg_logprob > segment["avg_logprob"]:
+        segment.update(
+            text=decoded.text if decoded.text.startswith(" ") else " " + decoded.text,
+            tokens=decoded.tokens,
+            avg_logprob=decoded.avg_logprob,
+            compression_ratio=decoded.compression_ratio,
+            temperature=decoded.temperature,
+        )
+    return segment
+
+
+def fallback_summary(segments, profile: str = "adaptive") -> dict:
+    return {
+        "profile": profile,
+        "segments": len(segments),
+        "fallbacks": sum(1 for segment in segments if segment.get("fallback")),
+    }
+
+
+def transcribe_with_profile(model, audio, profile: str = "balanced", **options):
+    """
+    ``model.transcribe()`` with a named decoding profile.
+
+    The adaptive profile adds a ``decoding`` entry to the result counting how
+    many segments fell back to beam search.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Expected one of {list(PROFILES)}, got {profile}")
+    options = {**options, **PROFILES[profile]}
+    if profile != "adaptive":
+        return model.transcribe(audio, **options)
+
+    if isinstance(audio, str):
+        audio = whisper.load_audio(audio)
+    result = model.transcribe(audio, **options)
+    fp16 = options.get("fp16", True) and model.device.type != "cpu"
+    for segment in result["segments"]:
+        refine_segment(model, audio, segment, options.get("task", "transcribe"), result["language"], fp16)
+    result["text"] = "".join(segment["text"] for segment in result["segments"])
+    result["decoding"] = fallback_summary(result["segments"], profile)
+    return result
+
+
+def decode_with_fallback(model, features, options: whisper.DecodingOptions, temperatures=FALLBACK_TEMPERATURES):
+    """
+    Decode precomputed audio features, re-sampled if the result fails the thresholds.
+
+    Like ``whisper.transcribe``, a window that looks like silence (high
+    no-speech probability and low log probability) is not re-sampled: the
+    caller drops it, and a hot sample would only hallucinate text into it.
+    """
+    result = whisper.decode(model, features, options)[0]
+    for temperature in temperatures:
+        if result.compression_ratio <= COMPRESSION_RATIO_THRESHOLD and result.avg_logprob >= LOGPROB_THRESHOLD:
+            break
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+            break
+        retry = dataclasses.replace(options, temperature=temperature, best_of=5, beam_size=None, patience=None)
+        result = whisper.decode(model, features, retry)[0]
+    return result
+
+
+def split_timestamps(tokens, timestamp_begin: int):
+    """
+    Split one window's tokens into ``(start_pos, end_pos, text_tokens)`` spans.
+
+    Positions are in timestamp-token units. Also returns how many of those
+    units the window consumed, or None when the whole window was consumed.
+    Mirrors the segmentation in ``whisper.transcribe``.
+    """
+    is_timestamp = [token >= timestamp_begin for token in tokens]
+    single_timestamp_ending = is_timestamp[-2:] == [False, True]
+    consecutive = [i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]]
+
+    if not consecutive:
+        timestamps = [token for token, flag in zip(tokens, is_timestamp) if flag]
+        end = timestamps[-1] - timestamp_begin if timestamps and timestamps[-1] != timestamp_begin else None
+        text = [token for token, flag in zip(tokens, is_timestamp) if not flag]
+        return [(0, end, text)], None
+
+    if single_timestamp_ending:
+        consecutive.append(len(tokens))
+    spans = []
+    last = 0
+    for current in consecutive:
+        sliced = tokens[last:current]
+        spans.append((sliced[0] - timestamp_begin, sliced[-1] - timestamp_begin, [t for t in sliced if t < timestamp_begin]))
+        last = current
+    consumed = None if single_timestamp_ending else tokens[last - 1] - timestamp_begin
+    return spans, consumed
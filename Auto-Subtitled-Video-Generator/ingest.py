@@ -0,0 +1,173 @@
+import os
+import subprocess
+import threading
+import time
+
+import numpy as np
+import yt_dlp
+from whisper.audio import SAMPLE_RATE
+
+CHUNK_BYTES = 1 << 16
+POLL_SECONDS = 0.2
+
+
+class StreamingUnsupported(RuntimeError):
+    """ffmpeg could not demux the download while it was still growing."""
+
+
+class GrowingAudio:
+    """
+    Mono float32 PCM that is still being decoded. Readers block in ``wait()``
+    until enough samples have arrived or the source has ended.
+    """
+
+    def __init__(self):
+        self._pcm = np.zeros(SAMPLE_RATE * 60, dtype=np.float32)
+        self._size = 0
+        self._tail = b""
+        self._cond = threading.Condition()
+        self.finished = False
+        self.error = None
+
+    def append(self, data: bytes):
+        data = self._tail + data
+        usable = len(data) - len(data) % 2
+        self._tail = data[usable:]
+        samples = np.frombuffer(data[:usable], np.int16).astype(np.float32) / 32768.0
+        with self._cond:
+            if self._size + len(samples) > len(self._pcm):
+                grown = np.zeros(max(2 * len(self._pcm), self._size + len(samples)), dtype=np.float32)
+                grown[:self._size] = self._pcm[:self._size]
+                self._pcm = grown
+            self._pcm[self._size:self._size + len(samples)] = samples
+            self._size += len(samples)
+            self._cond.notify_all()
+
+    def finish(self, error: Exception = None):
+        """Mark the audio complete, or failed with ``error``, which readers re-raise."""
+        with self._cond:
+            self.finished = True
+            self.error = error
+            self._cond.notify_all()
+
+    def wait(self, samples: int) -> int:
+        """Block until ``samples`` are available or the audio ended; return how many there are."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._size >= samples or self.finished)
+            if self.error is not None:
+                raise self.error
+            return self._size
+
+    def array(self) -> np.ndarray:
+        """The samples decoded so far (a view, valid until more arrive)."""
+        with self._cond:
+            return self._pcm[:self._size]
+
+    def __len__(self):
+        return self._size
+
+
+class StreamingDownload:
+    """
+    Download a YouTube video to disk while ffmpeg decodes it.
+
+    yt-dlp writes straight to the final file; a feeder thread tails that
+    growing file into ffmpeg's stdin and a reader thread collects the s16le
+    output in ``audio``, so transcription can start on the first complete
+    30 s window instead of after the whole download.
+    """
+
+    def __init__(self, link, out_dir, progress_hook=None):
+        self.link = link
+        self.path = os.path.join(out_dir, "youtube_video.mp4")
+        self.progress_hook = progress_hook
+        self.audio = GrowingAudio()
+        self.duration = None
+        self.download_error = None
+        self._metadata = threading.Event()
+        self._downloaded = threading.Event()
+
+    def start(self):
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1",
+             "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        for target in (self._download, self._feed, self._read):
+            threading.Thread(target=target, name=f"stream-{target.__name__.strip('_')}", daemon=True).start()
+        return self
+
+    def _download(self):
+        ydl_opts = {
+            'format': 'best[ext=mp4]',
+            'outtmpl': self.path,
+            'nopart': True,
+            'quiet': True,
+            'no_warnings': True,
+            'progress_hooks': [self.progress_hook] if self.progress_hook else [],
+        }
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(self.link, download=False)
+                self.duration = info.get("duration")
+                self._metadata.set()
+                ydl.process_ie_result(info, download=True)
+        except Exception as e:
+            self.download_error = e
+        finally:
+            self._metadata.set()
+            self._downloaded.set()
+
+    def _feed(self):
+        try:
+            while not os.path.exists(self.path):
+                if self._downloaded.is_set():
+                    return
+                time.sleep(POLL_SECONDS)
+            with open(self.path, "rb") as f:
+                while True:
+                    # Checked before reading, so an empty read after it means the file is complete.
+                    downloaded = self._downloaded.is_set()
+                    chunk = f.read(CHUNK_BYTES)
+                    if chunk:
+                        self._process.stdin.write(chunk)
+                    elif downloaded:
+                        return
+                    else:
+                        time.sleep(POLL_SECONDS)
+        except (BrokenPipeError, OSError):
+            # ffmpeg gave up; the reader reports why.
+            pass
+        finally:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+
+    def _read(self):
+        while chunk := self._process.stdout.read(CHUNK_BYTES):
+            self.audio.append(chunk)
+        stderr = self._process.stderr.read().decode(errors="ignore")
+        self._process.wait()
+        self._downloaded.wait()
+        if self.download_error is not None:
+            self.audio.finish(self.download_error)
+        elif self._process.returncode != 0:
+            # Typically an MP4 whose index is at the end, which cannot be read from a pipe.
+            self.audio.finish(StreamingUnsupported(
+                f"FFmpeg cannot decode the download while it grows: {stderr or f'exit status {self._process.returncode}'}"
+            ))
+        else:
+            self.audio.finish()
+
+    def wait_metadata(self):
+        self._metadata.wait()
+        if self.download_error is not None:
+            raise self.download_error
+        return self.duration
+
+    def wait_download(self) -> str:
+        self._downloaded.wait()
+        if self.download_error is not None:
+            raise self.download_error
+        return self.path
@@ -0,0 +1,128 @@
+import os
+
+import streamlit as st
+
+from jobs import DONE, FAILED, get_manager
+from languages import iso_639_2
+from workspace import workspaces
+
+POLL_SECONDS = 1.0
+
+
+def remember_job(kind: str, job_id: str):
+    """Attach a job to this session and to the page URL so a reload finds it."""
+    st.session_state[f"{kind}_job"] = job_id
+    st.query_params["job"] = job_id
+
+
+def current_job(kind: str):
+    # A page can run more than one kind of job; the URL holds the latest one.
+    for job_id in (st.query_params.get("job"), st.session_state.get(f"{kind}_job")):
+        job = get_manager().get(job_id) if job_id else None
+        if job is not None and job["kind"] == kind:
+            return job
+    return None
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _poll(job_id: str):
+    job = get_manager().get(job_id)
+    if job["status"] in (DONE, FAILED):
+        st.rerun()
+    stage = job["stage"] or job["stages"][0]
+    st.progress(job["progress"], text=f"{stage.capitalize()}... ({job['progress']:.0%})")
+    if job["detail"]:
+        st.caption(format_detail(job["detail"]))
+    partial = job["result"]
+    if partial and partial.get("live"):
+        # Segments are published as soon as each 30 s window is decoded.
+        with st.container(height=250):
+            st.write(partial["text"])
+    if partial and partial.get("batch"):
+        show_batch_items(partial["items"])
+
+
+def format_detail(detail: dict) -> str:
+    """Throughput and ETA of the current stage, e.g. "2.4 MB/s · about 12 s left"."""
+    parts = []
+    rate, unit = detail.get("rate"), detail.get("unit")
+    if rate and unit == "B":
+        parts.append(f"{rate / 2**20:.1f} MB/s")
+    elif rate and unit == "s":
+        # Media seconds processed per wall-clock second.
+        parts.append(f"{rate:.1f}x realtime")
+    elif rate and unit:
+        parts.append(f"{rate * 3600:.0f} {unit}/hour")
+    if detail.get("eta") is not None:
+        parts.append(f"about {detail['eta']:.0f} s left")
+    return " · ".join(parts)
+
+
+BUTTON_LABELS = {
+    "Transcribe": "Transcribe",
+    "Translate": "Translate to English",
+    "Transcribe + Translate": "Transcribe and Translate",
+}
+
+
+def show_decoding_notes(results):
+    """Captions on how a result was decoded: adaptive fallbacks, skipped silence and cascade escalation."""
+    if results.get("decoding"):
+        st.caption(f"{results['decoding']['fallbacks']} of {results['decoding']['segments']} segments were re-decoded with beam search.")
+    if results.get("vad"):
+        speedup = results["vad"]["estimated_speedup"]
+        st.caption(f"Voice activity detection skipped {results['vad']['skipped_fraction']:.0%} of the audio as silence or music"
+                   + (f", about {speedup:.1f}x faster than decoding all of it." if speedup else "."))
+    if results.get("cascade"):
+        speedup = results["cascade"]["estimated_speedup"]
+        st.caption(f"Cascade: {results['cascade']['escalated_fraction']:.0%} of the audio was escalated to the large model"
+                   + (f", about {speedup:.1f}x faster than running it throughout." if speedup else "."))
+
+
+def player_subtitles(results):
+    """
+    The WebVTT of each muxed subtitle track keyed by its ISO 639-2 code, for
+    ``st.video``: the browser player does not read tracks inside the MP4.
+    None when the subtitles are burned in.
+    """
+    if results.get("subtitle_mode", "burn") != "soft":
+        return None
+    files = [results["vtt"]] + ([results["translation"]["vtt"]] if results.get("translation") else [])
+    tracks = {}
+    for language, vtt in zip(results.get("subtitle_languages") or [results["language"]], files):
+        label = iso_639_2(language)
+        tracks[label if label not in tracks else f"{label} (translation)"] = vtt
+    return tracks
+
+
+def show_batch_items(items):
+    st.dataframe(
+        [{"Video": item["id"], "Status": item["status"], "Attempts": item["attempts"], "Error": item["error"] or ""}
+         for item in items],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+def job_finished(job) -> bool:
+    """Render the state of a job; returns True once its result can be shown."""
+    if job["status"] == DONE:
+        workspace = workspaces.get(job["kind"], job["id"])
+        if not workspace.exists():
+            st.warning("The files of this job have expired; please run it again.")
+            return False
+        workspace.touch()
+        return True
+    if job["status"] == FAILED:
+        st.error(f"❌ An error occurred: {job['error']}")
+        partial = job["result"]
+        if partial and partial.get("live") and os.path.exists(partial["srt"]):
+            with open(partial["srt"], "rb") as f:
+                st.download_button(
+                    f"Download partial subtitles (up to {partial['position']:.0f}s)",
+                    f.read(),
+                    file_name="transcript_partial.srt",
+                )
+        return False
+    _poll(job["id"])
+    return False
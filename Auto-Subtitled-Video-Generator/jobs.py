@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import pathlib
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = pathlib.Path(__file__).parent.absolute()
+
+JOBS_DB = APP_DIR / "jobs.db"
+
+# Number of pipelines allowed to run at the same time in this server process.
+MAX_CONCURRENT_JOBS = int(os.environ.get("ANUVADIKA_MAX_CONCURRENT_JOBS", "2"))
+
+# Minimum time between two progress writes of the same stage.
+PROGRESS_INTERVAL_SECONDS = float(os.environ.get("ANUVADIKA_PROGRESS_INTERVAL_SECONDS", "0.3"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    stages TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    params TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    detail TEXT,
+    owner TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+
+def _boot_id() -> str:
+    try:
+        with open("/proc/sys/kernel/random/boot_id", encoding="ascii") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def _start_time(pid: int):
+    """Start time of a process in clock ticks since boot, or None where /proc cannot tell."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+# Identifies the server process running a job. The start time tells a
+# restarted container, which often gets the same pid again, from the old process.
+OWNER = json.dumps([socket.gethostname(), _boot_id(), os.getpid(), _start_time(os.getpid())])
+
+
+def _owner_alive(owner) -> bool:
+    """Whether the process that recorded ``owner`` may still be running its jobs."""
+    if owner is None:
+        # Written before jobs had owners, by a process that is gone.
+        return False
+    host, boot, pid, start = json.loads(owner)
+    if host != socket.gethostname():
+        # Another machine sharing the database; only it can tell.
+        return True
+    if boot != _boot_id():
+        return False
+    if start is not None:
+        return _start_time(pid) == start
+    if os.name != "posix":
+        # No cheap liveness check; os.kill(pid, 0) would signal the process on Windows.
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Alive, but running as another user.
+        pass
+    return True
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+class JobContext:
+    """Handle passed to a running pipeline so it can report stage and progress."""
+
+    def __init__(self, manager, job_id: str, stages):
+        self.manager = manager
+        self.id = job_id
+        self.stages = list(stages)
+        self._lock = threading.Lock()
+        # Per stage: when it was first reported, last written and how far along it is.
+        # Stages can overlap, e.g. a streaming download is transcribed while it runs.
+        self._started = {}
+        self._last_write = {}
+        self._fractions = {}
+
+    def report(self, stage: str, fraction: float = 0.0, done: float = None, unit: str = None):
+        """
+        Record progress as the stage name plus the fraction of that stage done.
+
+        ``done`` is the amount of work finished in ``unit`` (bytes for
+        downloads, media seconds for ffmpeg) and gives the stage throughput.
+        Writes are rate-limited to one per PROGRESS_INTERVAL_SECONDS per
+        stage, so hooks can call this on every callback. When stages overlap
+        the job shows the furthest one reached, so its progress never jumps back.
+        """
+        index = self.stages.index(stage)
+        fraction = min(max(fraction, 0.0), 1.0)
+        now = time.monotonic()
+        with self._lock:
+            started = self._started.setdefault(stage, now)
+            if stage in self._last_write and fraction < 1.0 and now - self._last_write[stage] < PROGRESS_INTERVAL_SECONDS:
+                self._fractions[stage] = fraction
+                return
+            self._last_write[stage] = now
+            self._fractions[stage] = fraction
+            furthest = max(self._fractions, key=self.stages.index)
+            elapsed = now - started
+        if stage != furthest:
+            # A later stage is already under way; showing this one would move the job back.
+            return
+        detail = {"elapsed": elapsed}
+        if 0.0 < fraction < 1.0 and elapsed > 0:
+            detail["eta"] = elapsed * (1.0 - fraction) / fraction
+        if done is not None and elapsed > 0:
+            detail.update(rate=done / elapsed, unit=unit)
+        progress = (index + fraction) / len(self.stages)
+        self.manager._update(self.id, stage=stage, progress=progress, detail=json.dumps(detail))
+
+    def publish(self, partial: dict):
+        """Expose a partial result while the job is still running."""
+        self.manager._update(self.id, result=json.dumps(partial))
+
+
+class JobManager:
+    """
+    Runs pipelines on a bounded thread pool and keeps their state in SQLite.
+
+    Jobs outlive the Streamlit script run that submitted them, so a page can
+    rerun, or be reloaded with the job ID in its URL, and pick the job back up.
+    """
+
+    def __init__(self, db_path=JOBS_DB, max_workers: int = MAX_CONCURRENT_JOBS):
+        self.db_path = str(db_path)
+        self._write_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "detail" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN detail TEXT")
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            # Jobs in flight in a process that has died are lost. Other live
+            # server processes share this database; their jobs are left alone.
+            stale = [row["id"] for row in conn.execute("SELECT id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING))
+                     if not _owner_alive(row["owner"])]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                [(FAILED, "Interrupted by a server restart", time.time(), job_id) for job_id in stale],
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _update(self, job_id: str, **fields):
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._write_lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, kind: str, fn, params: dict, stages, job_id: str = None) -> str:
+        """
+        Queue ``fn(job, **params)`` and return the job ID.
+
+        ``params`` must be JSON serialisable; ``fn`` returns a JSON serialisable
+        result that is stored once the job is done.
+        """
+        job_id = job_id or new_job_id()
+        now = time.time()
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, stage, stages, progress, params, owner, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, stages[0], json.dumps(list(stages)), json.dumps(params), OWNER, now, now),
+            )
+        self._executor.submit(self._run, job_id, fn, params, stages)
+        return job_id
+
+    def record(self, kind: str, params: dict, result: dict, stages, job_id: str = None) -> str:
+        """Store a job that finished without running, e.g. one served from a cache."""
+        job_id = job_id or new_job_id()
+        now = time.time()
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, stage, stages, progress, params, result, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)",
+                (job_id, kind, DONE, stages[-1], json.dumps(list(stages)), json.dumps(params), json.dumps(result), now, now),
+            )
+        return job_id
+
+    def _run(self, job_id, fn, params, stages):
+        self._update(job_id, status=RUNNING)
+        try:
+            result = fn(JobContext(self, job_id, stages), **params)
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self._update(job_id, status=FAILED, error=str(e))
+        else:
+            self._update(job_id, status=DONE, progress=1.0, result=json.dumps(result))
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _decode(row) if row else None
+
+    def list_jobs(self, kind: str = None, limit: int = 50):
+        query = "SELECT * FROM jobs"
+        args = ()
+        if kind:
+            query += " WHERE kind = ?"
+            args = (kind,)
+        query += " ORDER BY created DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, (*args, limit)).fetchall()
+        return [_decode(row) for row in rows]
+
+
+def _decode(row) -> dict:
+    job = dict(row)
+    job["stages"] = json.loads(job["stages"])
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["detail"] = json.loads(job["detail"]) if job.get("detail") else None
+    return job
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> JobManager:
+    """Process-wide job manager shared by every page and session."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
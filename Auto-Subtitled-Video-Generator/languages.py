@@ -98,4 +98,9 @@ LANGUAGES = {
     "ba": "bak",
     "jw": "jav",
     "su": "sun",
-}
\ No newline at end of file
+}
+
+
+def iso_639_2(code: str) -> str:
+    """The ISO 639-2 code for a whisper language code, "und" when it is not known."""
+    return LANGUAGES.get(code, "und")
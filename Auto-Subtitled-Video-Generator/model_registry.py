@@ -0,0 +1,312 @@
+import os
+import contextlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import torch
+import whisper
+from whisper.model import Linear, ModelDimensions, Whisper
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+# Upper bound for the combined weight memory of all resident models, in MB.
+MODEL_RAM_BUDGET_MB = int(os.environ.get("ANUVADIKA_MODEL_RAM_BUDGET_MB", "4096"))
+
+# "standard" uses whisper.load_model; "mmap" maps the checkpoint into memory so
+# every worker process shares the same page-cache copy of the weights.
+# Trade-off: on CPU the mapped weights stay in the checkpoint's fp16, and
+# Whisper's Linear/Conv1d cast them to fp32 on every forward pass, including
+# once per decoded token. That buys shared, lazily loaded memory with extra
+# per-token compute; measure it with benchmarks/bench_precision.py --load-mode
+# before enabling it on CPU hosts with spare RAM. Needs torch >= 2.1.
+MODEL_LOAD_MODE = os.environ.get("ANUVADIKA_MODEL_LOAD_MODE", "standard")
+
+# Comma separated model sizes to load and warm up in the background at startup.
+WARMUP_SIZES = [s for s in os.environ.get("ANUVADIKA_WARMUP_SIZES", "").split(",") if s]
+
+# fp32: full precision weights (Whisper's fp16 decoding is still used on CUDA).
+# int8: Linear layers dynamically quantized to int8, CPU only.
+# bf16: fp32 weights with bfloat16 autocast around inference.
+PRECISIONS = ["fp32", "int8", "bf16"]
+LOAD_MODES = ["standard", "mmap"]
+
+
+def load_model_mmap(name: str, device: str = DEVICE):
+    """
+    Load a Whisper checkpoint through memory-mapped tensors.
+
+    The weights stay backed by the checkpoint file (in its stored dtype) instead
+    of being copied into private fp32 buffers, so several server processes
+    share one copy through the page cache and loading is mostly lazy I/O.
+    """
+    download_root = os.path.join(os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "whisper")
+    if name in whisper._MODELS:
+        checkpoint_file = whisper._download(whisper._MODELS[name], download_root, False)
+        alignment_heads = whisper._ALIGNMENT_HEADS[name]
+    elif os.path.isfile(name):
+        checkpoint_file = name
+        alignment_heads = None
+    else:
+        raise RuntimeError(f"Model {name} not found; available models = {whisper.available_models()}")
+
+    checkpoint = torch.load(checkpoint_file, map_location="cpu", mmap=True, weights_only=True)
+    model = Whisper(ModelDimensions(**checkpoint["dims"]))
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+
+    if device == "cpu":
+        # Whisper's Linear/Conv1d cast weights to the input dtype on the fly, but
+        # LayerNorm needs its (tiny) parameters in fp32 for fp32 activations.
+        for module in model.modules():
+            if isinstance(module, torch.nn.LayerNorm):
+                module.float()
+    return model.to(device)
+
+
+def quantize_int8(model):
+    """
+    Dynamically quantize every Linear layer of a CPU model to int8.
+
+    Whisper's own Linear subclass isn't recognised by ``quantize_dynamic``, so
+    each one is first swapped for a plain ``nn.Linear`` sharing its weights;
+    on CPU inference runs in fp32 so the dtype casting it did is not needed.
+    """
+    for parent in list(model.modules()):
+        for name, child in parent.named_children():
+            if type(child) is Linear:
+                plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                plain.weight = torch.nn.Parameter(child.weight.detach().float())
+                if child.bias is not None:
+                    plain.bias = torch.nn.Parameter(child.bias.detach().float())
+                setattr(parent, name, plain)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def bf16_supported(device: str = DEVICE) -> bool:
+    if device.startswith("cuda"):
+        return torch.cuda.is_bf16_supported()
+    try:
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            torch.ones(2, 2) @ torch.ones(2, 2)
+        return True
+    except RuntimeError:
+        return False
+
+
+def supported_precisions(device: str = DEVICE):
+    precisions = ["fp32"]
+    if device == "cpu":
+        precisions.append("int8")
+    if bf16_supported(device):
+        precisions.append("bf16")
+    return precisions
+
+
+def _encoder_output_fp32(module, inputs, output):
+    # Under bf16 autocast the encoder returns bf16 audio features, but with
+    # fp16=False Whisper's decoder only accepts fp32 features (and on a
+    # mismatch returns a TypeError instead of raising it). The decoder still
+    # runs under autocast, so casting back only costs one copy per window.
+    return output.float()
+
+
+def precision_context(model):
+    """Context to run inference in for a model returned by the registry."""
+    if getattr(model, "precision", "fp32") == "bf16":
+        return torch.autocast(model.device.type, dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+
+def decode_options_for(model) -> dict:
+    """Extra ``transcribe()`` options a model's precision requires."""
+    # Whisper's fp16 path would cast the mel to half, fighting bf16 autocast.
+    if getattr(model, "precision", "fp32") == "bf16":
+        return {"fp16": False}
+    return {}
+
+
+def warm_up(model):
+    """Run a short dummy decode so kernels and lazily mapped pages are ready."""
+    audio = np.zeros(whisper.audio.N_SAMPLES, dtype=np.float32)
+    mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels).to(model.device)
+    fp16 = model.device.type == "cuda" and getattr(model, "precision", "fp32") == "fp32"
+    options = whisper.DecodingOptions(language="en", without_timestamps=True, sample_len=8, fp16=fp16)
+    with torch.no_grad(), precision_context(model):
+        whisper.decode(model, mel, options)
+
+
+def model_nbytes(model) -> int:
+    """Approximate resident size of a model from its state dict."""
+    total = 0
+    for value in model.state_dict().values():
+        # Dynamically quantized Linear layers store (weight, bias) packed together.
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded Whisper models keyed by (size, device, precision).
+
+    Every Streamlit page shares the same instance, so a model is loaded once per
+    server process instead of once per page and rerun. When the resident models
+    exceed the RAM budget, the least recently used ones are evicted.
+    """
+
+    def __init__(self, budget_bytes: int, load_mode: str = "standard"):
+        if load_mode not in LOAD_MODES:
+            raise ValueError(f"Expected one of {LOAD_MODES}, got {load_mode}")
+        self.budget_bytes = budget_bytes
+        self.load_mode = load_mode
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = {}
+
+    def get(self, size: str, device: str = DEVICE, precision: str = "fp32"):
+        key = (size, device, precision)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other sizes stay available, but
+        # serialise loads of the same key so concurrent callers share one copy.
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self.hits += 1
+                    return self._models[key]
+                self.misses += 1
+
+            start = time.perf_counter()
+            model = self._load(size, device, precision)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._models[key] = model
+                self._sizes[key] = model_nbytes(model)
+                self.load_seconds[key] = elapsed
+                self._evict(keep=key)
+            return model
+
+    def _load(self, size, device, precision):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Expected one of {PRECISIONS}, got {precision}")
+        if precision == "int8" and device != "cpu":
+            raise ValueError("int8 dynamic quantization is only available on CPU")
+        if self.load_mode == "mmap":
+            model = load_model_mmap(size, device=device)
+        else:
+            model = whisper.load_model(size, device=device)
+        if precision == "int8":
+            model = quantize_int8(model)
+        if precision == "bf16":
+            model.encoder.register_forward_hook(_encoder_output_fp32)
+        model.precision = precision
+        return model
+
+    def _evict(self, keep):
+        evicted = False
+        while self.resident_bytes() > self.budget_bytes and len(self._models) > 1:
+            key = next(k for k in self._models if k != keep)
+            del self._models[key]
+            del self._sizes[key]
+            self.evictions += 1
+            evicted = True
+        if evicted and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def is_loaded(self, size: str, device: str = DEVICE, precision: str = "fp32") -> bool:
+        with self._lock:
+            return (size, device, precision) in self._models
+
+    def loaded(self):
+        with self._lock:
+            return list(self._models)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "resident_models": [list(k) for k in self._models],
+                "resident_bytes": self.resident_bytes(),
+                "budget_bytes": self.budget_bytes,
+                "load_mode": self.load_mode,
+                "load_seconds": {"/".join(k): round(v, 3) for k, v in self.load_seconds.items()},
+            }
+
+
+registry = ModelRegistry(MODEL_RAM_BUDGET_MB * 1024 * 1024, load_mode=MODEL_LOAD_MODE)
+
+
+def get_model(size: str, device: str = DEVICE, precision: str = "fp32"):
+    return registry.get(size, device=device, precision=precision)
+
+
+_inference_locks = weakref.WeakKeyDictionary()
+_inference_locks_guard = threading.Lock()
+
+
+def inference_lock(model) -> threading.Lock:
+    """
+    Lock serialising decodes on one model instance.
+
+    Whisper installs its kv-cache hooks on the shared modules during a decode,
+    so two jobs must not run the same model object at the same time.
+    """
+    with _inference_locks_guard:
+        lock = _inference_locks.get(model)
+        if lock is None:
+            lock = _inference_locks[model] = threading.Lock()
+        return lock
+
+
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+warmup_errors = {}
+
+
+def _warm_sizes(sizes):
+    for size in sizes:
+        try:
+            model = get_model(size)
+            with inference_lock(model):
+                warm_up(model)
+        except Exception as e:
+            warmup_errors[size] = str(e)
+
+
+def start_warmup(sizes=None):
+    """
+    Load and warm the configured model sizes on a daemon thread.
+
+    Safe to call from every page on every rerun: only the first call starts a
+    thread. Pages keep rendering while the models load.
+    """
+    global _warmup_thread
+    sizes = WARMUP_SIZES if sizes is None else sizes
+    with _warmup_lock:
+        if _warmup_thread is not None or not sizes:
+            return _warmup_thread
+        _warmup_thread = threading.Thread(target=_warm_sizes, args=(list(sizes),), name="whisper-warmup", daemon=True)
+        _warmup_thread.start()
+        return _warmup_thread
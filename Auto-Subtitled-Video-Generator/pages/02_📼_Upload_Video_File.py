@@ -1,16 +1,14 @@
-import whisper
 import streamlit as st
 from streamlit_lottie import st_lottie
-from utils import write_vtt, write_srt
-import ffmpeg
+from model_registry import start_warmup, supported_precisions
+from decoding import PROFILES
+from jobs import get_manager, new_job_id
+from job_ui import current_job, job_finished, player_subtitles, remember_job, show_decoding_notes
+from pipeline import SUBTITLE_MODES, TASKS, VIDEO_STAGES, run_video_job
+from workspace import QuotaExceeded, start_collector, workspaces
 import requests
-from typing import Iterator
-from io import StringIO
-import numpy as np
 import pathlib
 import os
-import subprocess
-import shutil
 
 # Set up FFmpeg paths
 APP_DIR = pathlib.Path(__file__).parent.absolute()
@@ -22,92 +20,6 @@ FFMPEG_EXE = FFMPEG_BIN / "ffmpeg.exe"
 FFMPEG_DIR.mkdir(exist_ok=True)
 FFMPEG_BIN.mkdir(exist_ok=True)
 
-LOCAL_DIR = APP_DIR / "local"
-LOCAL_DIR.mkdir(exist_ok=True)
-save_dir = LOCAL_DIR / "output"
-save_dir.mkdir(exist_ok=True)
-
-@st.cache_resource
-def inference(_loaded_model, uploaded_file, task): 
-    with open(f"{save_dir}/input.mp4", "wb") as f:
-            if not uploaded_file or uploaded_file.size == 0:
-                st.error("No file uploaded or the file is empty. Please upload a valid video file.")
-                return None
-            f.write(uploaded_file.getbuffer())
-    audio = ffmpeg.input(f"{save_dir}/input.mp4")
-    audio = ffmpeg.output(audio, f"{save_dir}/output.wav", acodec="pcm_s16le", ac=1, ar="16k")
-    
-    ffmpeg.run(audio, overwrite_output=True)
-    if task == "Transcribe":
-        options = dict(task="transcribe", best_of=5)
-        results = _loaded_model.transcribe(f"{save_dir}/output.wav", **options)
-        vtt = getSubs(results["segments"], "vtt", 80)
-        srt = getSubs(results["segments"], "srt", 80)
-        lang = results["language"]
-        return results["text"], vtt, srt, lang
-    elif task == "Translate":
-        options = dict(task="translate", best_of=5)
-        results = _loaded_model.transcribe(f"{save_dir}/output.wav", **options)
-        vtt = getSubs(results["segments"], "vtt", 80)
-        srt = getSubs(results["segments"], "srt", 80)
-        lang = results["language"]
-        return results["text"], vtt, srt, lang
-    else:
-        raise ValueError("Task not supported")
-
-def getSubs(segments: Iterator[dict], format: str, maxLineWidth: int) -> str:
-    segmentStream = StringIO()
-
-    if format == 'vtt':
-        write_vtt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
-    elif format == 'srt':
-        write_srt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
-    else:
-        raise Exception("Unknown format " + format)
-
-    segmentStream.seek(0)
-    return segmentStream.read()
-
-def generate_subtitled_video(video, audio, transcript):
-    try:
-        # First, write the transcript file
-        with open("transcript.srt", "w", encoding="utf-8") as f:
-            f.write(transcript)
-        
-        # Use a simpler FFmpeg command that's more reliable
-        command = [
-            str(FFMPEG_EXE),
-            "-i", video,
-            "-vf", f"subtitles=transcript.srt:force_style='FontName=Arial,FontSize=24,PrimaryColour=&HFFFFFF&,OutlineColour=&H000000&,Outline=1'",
-            "-c:a", "copy",
-            "-y",  # Overwrite output file if it exists
-            "final.mp4"
-        ]
-        
-        # Run FFmpeg command
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True
-        )
-        
-        # Get output and errors
-        stdout, stderr = process.communicate()
-        
-        if process.returncode != 0:
-            st.error(f"FFmpeg error: {stderr}")
-            raise Exception(f"FFmpeg failed with error: {stderr}")
-        
-        if not os.path.exists("final.mp4"):
-            raise Exception("FFmpeg did not create the output file")
-            
-        return "final.mp4"
-        
-    except Exception as e:
-        st.error(f"Error in video processing: {str(e)}")
-        raise
-
 # Check if FFmpeg is installed locally
 def check_ffmpeg():
     if not FFMPEG_EXE.exists():
@@ -132,6 +44,9 @@ os.environ["PATH"] = str(FFMPEG_BIN) + os.pathsep + os.environ["PATH"]
 
 st.set_page_config(page_title="Auto Subtitled Video Generator", page_icon=":movie_camera:", layout="wide")
 
+start_warmup()
+start_collector()
+
 # Check FFmpeg installation
 if not check_ffmpeg():
     st.stop()
@@ -148,9 +63,6 @@ def load_lottieurl(url: str):
         st.warning(f"Could not load animation: {str(e)}")
         return None
 
-loaded_model = whisper.load_model("base")
-current_size = "None"
-
 # Main header with better styling
 st.markdown("""
     <div style='text-align: center; padding: 20px; background-color: #4CAF50; color: white; border-radius: 10px;'>
@@ -168,12 +80,36 @@ with st.sidebar:
         index=1,
         help="Larger models provide better accuracy but take longer to process"
     )
+    precision = st.selectbox(
+        "Select Precision",
+        supported_precisions(),
+        index=0,
+        help="int8 and bf16 run faster on CPU at a small cost in accuracy"
+    )
     task = st.selectbox(
         "Select Task",
-        ["Transcribe", "Translate"],
+        list(TASKS),
         index=0,
-        help="Transcribe: Keep original language\nTranslate: Convert to English"
+        help="Transcribe: Keep original language\nTranslate: Convert to English\nTranscribe + Translate: Both, in a single pass"
+    )
+    profile = st.selectbox(
+        "Select Decoding Profile",
+        list(PROFILES),
+        index=1,
+        help="fast: greedy only\nbalanced: greedy with sampling fallback\naccurate: beam search\nadaptive: greedy, re-decoding only doubtful segments"
     )
+    vad = st.checkbox(
+        "Skip silence and music",
+        value=False,
+        help="Detect speech first and decode only those regions; faster on lectures and streams with long pauses"
+    )
+    subtitle_mode = SUBTITLE_MODES[st.radio(
+        "Subtitles",
+        list(SUBTITLE_MODES),
+        index=0,
+        help="A subtitle track is muxed without re-encoding and can be switched on and off in the player; "
+             "burning them in re-encodes the whole video"
+    )]
     
     st.markdown("---")
     st.markdown("### ℹ️ About")
@@ -221,85 +157,103 @@ else:
 # Process button with better styling
 if input_file is not None:
     if st.button(f"🎬 Process Video ({task})", key="process_button"):
-        with st.spinner("Processing your video... This may take a few minutes"):
-            try:
-                results = inference(loaded_model, input_file, task)
-                
-                # Create two columns for video display
-                col3, col4 = st.columns(2)
-                
-                with col3:
-                    st.markdown("### Original Video")
-                    st.video(input_file)
-                
-                with col4:
-                    st.markdown("### Subtitled Video")
-                    with st.spinner("Generating subtitled video..."):
-                        output_path = generate_subtitled_video(
-                            f"{save_dir}/input.mp4",
-                            f"{save_dir}/output.wav",
-                            results[2]  # This is the SRT content
-                        )
-                        if os.path.exists(output_path):
-                            st.video(output_path)
-                            st.success("Subtitled video generated successfully!")
-                        else:
-                            st.error("Failed to generate subtitled video")
-                
-                # Download buttons in a grid
-                st.markdown("### 📥 Download Options")
-                
-                # Save transcript files
-                with open("transcript.txt", "w", encoding="utf-8") as f:
-                    f.write(results[0])  # Text content
-                with open("transcript.vtt", "w", encoding="utf-8") as f:
-                    f.write(results[1])  # VTT content
-                with open("transcript.srt", "w", encoding="utf-8") as f:
-                    f.write(results[2])  # SRT content
-                
-                col5, col6, col7, col8 = st.columns(4)
-                
-                with col5:
-                    with open("transcript.txt", "rb") as f:
-                        st.download_button(
-                            "Download Transcript (.txt)",
-                            f.read(),
-                            file_name="transcript.txt",
-                            help="Download text transcript"
-                        )
-                with col6:
-                    with open("transcript.vtt", "rb") as f:
-                        st.download_button(
-                            "Download Transcript (.vtt)",
-                            f.read(),
-                            file_name="transcript.vtt",
-                            help="Download VTT format subtitles"
-                        )
-                with col7:
-                    with open("transcript.srt", "rb") as f:
-                        st.download_button(
-                            "Download Transcript (.srt)",
-                            f.read(),
-                            file_name="transcript.srt",
-                            help="Download SRT format subtitles"
-                        )
-                with col8:
-                    if os.path.exists(output_path):
-                        with open(output_path, "rb") as f:
-                            st.download_button(
-                                "Download Video with Subtitles",
-                                f.read(),
-                                file_name=f"{filename}_with_subs.mp4",
-                                help="Download video with embedded subtitles"
-                            )
-                
-                # Information messages
-                st.info("💡 You can edit the downloaded subtitle files and re-upload them to YouTube for better control over the subtitles.")
-                st.success("✨ Processing complete! You can now download your files.")
-                
-            except Exception as e:
-                st.error(f"❌ An error occurred: {str(e)}")
-                st.error("Please try again or contact support if the problem persists.")
+        job_id = new_job_id()
+        try:
+            workspace = workspaces.create("video", job_id, reserve_bytes=input_file.size)
+        except QuotaExceeded as e:
+            st.error(str(e))
+        else:
+            with open(workspace.path("input.mp4"), "wb") as f:
+                f.write(input_file.getbuffer())
+            get_manager().submit(
+                "video",
+                run_video_job,
+                {"size": size, "task": task, "precision": precision, "profile": profile, "vad": vad,
+                 "subtitle_mode": subtitle_mode},
+                VIDEO_STAGES,
+                job_id=job_id,
+            )
+            remember_job("video", job_id)
+            st.session_state["video_filename"] = filename
+
+# The job runs in the background; a rerun or reload reattaches to it.
+job = current_job("video")
+if job is not None and job_finished(job):
+    results = job["result"]
+    output_path = results["subtitled_video"]
+    filename = st.session_state.get("video_filename") or "video"
+
+    # Create two columns for video display
+    col3, col4 = st.columns(2)
+
+    with col3:
+        st.markdown("### Original Video")
+        st.video(results["video"])
+
+    with col4:
+        st.markdown("### Subtitled Video")
+        if os.path.exists(output_path):
+            st.video(output_path, subtitles=player_subtitles(results))
+            st.success("Subtitled video generated successfully!")
+        else:
+            st.error("Failed to generate subtitled video")
+
+    # Download buttons in a grid
+    st.markdown("### 📥 Download Options")
+
+    col5, col6, col7, col8 = st.columns(4)
+
+    with col5:
+        with open(results["txt"], "rb") as f:
+            st.download_button(
+                "Download Transcript (.txt)",
+                f.read(),
+                file_name="transcript.txt",
+                help="Download text transcript"
+            )
+    with col6:
+        with open(results["vtt"], "rb") as f:
+            st.download_button(
+                "Download Transcript (.vtt)",
+                f.read(),
+                file_name="transcript.vtt",
+                help="Download VTT format subtitles"
+            )
+    with col7:
+        with open(results["srt"], "rb") as f:
+            st.download_button(
+                "Download Transcript (.srt)",
+                f.read(),
+                file_name="transcript.srt",
+                help="Download SRT format subtitles"
+            )
+    with col8:
+        if os.path.exists(output_path):
+            with open(output_path, "rb") as f:
+                st.download_button(
+                    "Download Video with Subtitles",
+                    f.read(),
+                    file_name=f"{filename}_with_subs.mp4",
+                    help="Download video with embedded subtitles"
+                )
+
+    translation = results.get("translation")
+    if translation:
+        col9, col10, col11 = st.columns(3)
+        for col, kind in zip((col9, col10, col11), ("txt", "vtt", "srt")):
+            with col:
+                with open(translation[kind], "rb") as f:
+                    st.download_button(
+                        f"Download English Translation (.{kind})",
+                        f.read(),
+                        file_name=f"transcript_en.{kind}",
+                        help="Download the English translation"
+                    )
+
+    # Information messages
+    show_decoding_notes(results)
+    st.info("💡 You can edit the downloaded subtitle files and re-upload them to YouTube for better control over the subtitles.")
+    st.success("✨ Processing complete! You can now download your files.")
 
 # Footer with better styling
 st.markdown("---")
@@ -308,11 +262,3 @@ st.markdown("""
         <p>Made with ❤️ by Yatin, Yashaswi, Vikas Gautum, Vikas</p>
     </div>
     """, unsafe_allow_html=True)
-
-@st.cache_resource
-def change_model(current_size, size):
-    if current_size != size:
-        loaded_model = whisper.load_model(size)
-        return loaded_model
-    else:
-        raise Exception("Model size is the same as the current size.")
\ No newline at end of file
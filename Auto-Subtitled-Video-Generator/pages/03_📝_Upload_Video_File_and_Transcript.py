@@ -1,19 +1,17 @@
 import streamlit as st
 from streamlit_lottie import st_lottie
-from utils import write_vtt, write_srt
-import ffmpeg
 import requests
-from typing import Iterator
-from io import StringIO
-import numpy as np
-import pathlib
-import os
-from zipfile import ZipFile
-from io import BytesIO
 import base64
+from jobs import new_job_id
+from languages import LANGUAGES
+from pipeline import SUBTITLE_MODES, make_zip, mux_subtitles, preview_subtitles
+from rerender import render_cache
+from workspace import QuotaExceeded, start_collector, workspaces
 
 st.set_page_config(page_title="Auto Subtitled Video Generator", page_icon=":movie_camera:", layout="wide")
 
+start_collector()
+
 # Define a function that we can use to load lottie files from a link.
 @st.cache(allow_output_mutation=True)
 def load_lottieurl(url: str):
@@ -23,14 +21,6 @@ def load_lottieurl(url: str):
     return r.json()
 
 
-APP_DIR = pathlib.Path(__file__).parent.absolute()
-
-LOCAL_DIR = APP_DIR / "local_transcript"
-LOCAL_DIR.mkdir(exist_ok=True)
-save_dir = LOCAL_DIR / "output"
-save_dir.mkdir(exist_ok=True)
-
-
 col1, col2 = st.columns([1, 3])
 with col1:
     lottie = load_lottieurl("https://assets6.lottiefiles.com/packages/lf20_cjnxwrkt.json")
@@ -43,26 +33,38 @@ with col2:
     ##### ➠ Processing time will increase as the video length increases. """)
 
 
-def getSubs(segments: Iterator[dict], format: str, maxLineWidth: int) -> str:
-    segmentStream = StringIO()
+def save_video(uploaded_file, workspace):
+    # The upload is used as is: its audio is stream-copied into the output, never decoded.
+    with open(workspace.path("input.mp4"), "wb") as f:
+        f.write(uploaded_file.getbuffer())
+    return workspace.path("input.mp4")
 
-    if format == 'vtt':
-        write_vtt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
-    elif format == 'srt':
-        write_srt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
-    else:
-        raise Exception("Unknown format " + format)
 
-    segmentStream.seek(0)
-    return segmentStream.read()
+def save_transcript(transcript_file, workspace, name="uploaded_transcript"):
+    transcript = workspace.path(f"{name}." + transcript_file.name[-3:])
+    with open(transcript, "wb") as f:
+        f.write(transcript_file.getbuffer())
+    return transcript
+
 
+def generate_preview(uploaded_video, transcript_file, workspace, start, length):
+    transcript = save_transcript(transcript_file, workspace)
+    return preview_subtitles(save_video(uploaded_video, workspace), transcript, workspace.path("preview.mp4"),
+                             start=start, end=start + length)
 
-def split_video_audio(uploaded_file):
-    with open(f"{save_dir}/input.mp4", "wb") as f:
-            f.write(uploaded_file.read())
-    audio = ffmpeg.input(f"{save_dir}/input.mp4")
-    audio = ffmpeg.output(audio, f"{save_dir}/output.wav", acodec="pcm_s16le", ac=1, ar="16k")
-    ffmpeg.run(audio, overwrite_output=True)
+
+def generate_subtitled_video(uploaded_video, tracks, workspace, subtitle_mode="soft"):
+    """``tracks`` is a list of (uploaded transcript, language); the first is burned in or muxed as the default."""
+    transcripts = [(save_transcript(f, workspace, f"uploaded_transcript_{i}" if i else "uploaded_transcript"), language)
+                   for i, (f, language) in enumerate(tracks)]
+    video = save_video(uploaded_video, workspace)
+    if subtitle_mode == "soft":
+        # Every language goes into the one output in a single stream-copy pass.
+        return mux_subtitles(video, transcripts, workspace.path("video_sub.mp4")), None
+    transcript = transcripts[0][0]
+    # A corrected transcript for a video rendered before only re-encodes the segments whose cues changed.
+    render = render_cache.render(video, transcript, workspace.path("video_sub.mp4"))
+    return str(workspace.path("video_sub.mp4")), render
 
 
 def main():
@@ -78,59 +80,61 @@ def main():
     else:
         transcript_name = None
     if uploaded_video is not None and transcript_file is not None:
-        if transcript_name[-3:] == "vtt":
-            with open("uploaded_transcript.vtt", "wb") as f:
-                f.writelines(transcript_file)
-                f.close()
-            with open(os.path.join(os.getcwd(), "uploaded_transcript.vtt"), "rb") as f:
-                vtt_file = f.read()
-            if st.button("Generate Video with Subtitles"):
-                with st.spinner("Generating Subtitled Video"):
-                    split_video_audio(uploaded_video)
-                    video_file = ffmpeg.input(f"{save_dir}/input.mp4")
-                    audio_file = ffmpeg.input(f"{save_dir}/output.wav")
-                    ffmpeg.concat(video_file.filter("subtitles", "uploaded_transcript.vtt"), audio_file, v=1, a=1).output("video_sub.mp4").run(quiet=True, overwrite_output=True)
-                    video_with_subs = open("video_sub.mp4", "rb")
-                col3, col4 = st.columns(2)
-                with col3:
-                    st.video(uploaded_video)
-                with col4:
-                    st.video(video_with_subs)
-                zipObj = ZipFile("subtitled_video.zip", "w")
-                zipObj.write("video_sub.mp4")
-                zipObj.close()
-                ZipfileDotZip = "subtitled_video.zip"
-                with open(ZipfileDotZip, "rb") as f:
-                    datazip = f.read()
-                    b64 = base64.b64encode(datazip).decode()
-                    href = f"<a href=\"data:file/zip;base64,{b64}\" download='{ZipfileDotZip}'>\
-            Download Subtitled Video\
-        </a>"
-                st.markdown(href, unsafe_allow_html=True)
-
-        elif transcript_name[-3:] == "srt":
-            with open("uploaded_transcript.srt", "wb") as f:
-                f.writelines(transcript_file)
-                f.close()
-            with open(os.path.join(os.getcwd(), "uploaded_transcript.srt"), "rb") as f:
-                srt_file = f.read()
+        if transcript_name[-3:] in ("vtt", "srt"):
+            subtitle_mode = SUBTITLE_MODES[st.radio("Subtitles", list(SUBTITLE_MODES), index=0, horizontal=True)]
+            language_names = lambda code: f"{code} ({LANGUAGES[code]})"
+            tracks = [(transcript_file, st.selectbox("Transcript language", list(LANGUAGES), format_func=language_names))]
+            if subtitle_mode == "soft":
+                extra_files = st.file_uploader("Subtitle tracks in other languages (optional)", type=["srt", "vtt"],
+                                               accept_multiple_files=True)
+                for i, extra in enumerate(extra_files or []):
+                    # Keyed by position: two uploads may share a file name.
+                    tracks.append((extra, st.selectbox(f"Language of {extra.name}", list(LANGUAGES),
+                                                       format_func=language_names, key=f"track-{i}")))
+            with st.expander("Preview subtitle placement before the full render"):
+                col5, col6 = st.columns(2)
+                with col5:
+                    preview_start = st.number_input("Start (seconds)", min_value=0.0, value=0.0, step=5.0)
+                with col6:
+                    preview_length = st.number_input("Length (seconds)", min_value=5.0, value=30.0, step=5.0)
+                if st.button("Render Preview"):
+                    try:
+                        workspace = workspaces.create("transcript", new_job_id(), reserve_bytes=uploaded_video.size)
+                    except QuotaExceeded as e:
+                        st.error(str(e))
+                        return
+                    with st.spinner("Rendering a low-resolution preview"):
+                        preview = generate_preview(uploaded_video, transcript_file, workspace, preview_start, preview_length)
+                    workspaces.finalize(workspace, [preview])
+                    st.video(preview)
             if st.button("Generate Video with Subtitles"):
+                # Each render gets its own workspace so concurrent sessions never share files.
+                try:
+                    workspace = workspaces.create("transcript", new_job_id(), reserve_bytes=uploaded_video.size)
+                except QuotaExceeded as e:
+                    st.error(str(e))
+                    return
                 with st.spinner("Generating Subtitled Video"):
-                    split_video_audio(uploaded_video)
-                    video_file = ffmpeg.input(f"{save_dir}/input.mp4")
-                    audio_file = ffmpeg.input(f"{save_dir}/output.wav")
-                    ffmpeg.concat(video_file.filter("subtitles",  "uploaded_transcript.srt"), audio_file, v=1, a=1).output("video_sub.mp4").run(quiet=True, overwrite_output=True)
-                    video_with_subs = open("video_sub.mp4", "rb")
+                    output, render = generate_subtitled_video(uploaded_video, tracks, workspace, subtitle_mode)
+                    video_with_subs = open(output, "rb")
+                if render is not None and render["rerendered"] < render["segments"]:
+                    st.caption(f"Re-encoded {render['rerendered']} of {render['segments']} segments; "
+                               "the rest were reused from the previous render of this video.")
                 col3, col4 = st.columns(2)
                 with col3:
                     st.video(uploaded_video)
                 with col4:
-                    st.video(video_with_subs)
-                zipObj = ZipFile("subtitled_video.zip", "w")
-                zipObj.write("video_sub.mp4")
-                zipObj.close()
+                    if subtitle_mode == "soft":
+                        st.video(video_with_subs, subtitles={
+                            f"{LANGUAGES[language]} ({i + 1})": f.getvalue().decode("utf-8", errors="ignore")
+                            for i, (f, language) in enumerate(tracks)
+                        })
+                    else:
+                        st.video(video_with_subs)
                 ZipfileDotZip = "subtitled_video.zip"
-                with open(ZipfileDotZip, "rb") as f:
+                make_zip(workspace.path(ZipfileDotZip), [output])
+                workspaces.finalize(workspace, [output, workspace.path(ZipfileDotZip)])
+                with open(workspace.path(ZipfileDotZip), "rb") as f:
                     datazip = f.read()
                     b64 = base64.b64encode(datazip).decode()
                     href = f"<a href=\"data:file/zip;base64,{b64}\" download='{ZipfileDotZip}'>\
@@ -142,7 +146,6 @@ def main():
     else:
         st.info("Please upload a video file and a transcript file")
 
-
 if __name__ == "__main__":
     main()
         
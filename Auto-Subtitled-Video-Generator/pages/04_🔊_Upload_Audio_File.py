@@ -1,25 +1,19 @@
-import whisper
 import streamlit as st
 from streamlit_lottie import st_lottie
-from utils import write_vtt, write_srt
-import ffmpeg
+from model_registry import start_warmup, supported_precisions
+from decoding import PROFILES
+from jobs import get_manager, new_job_id
+from job_ui import BUTTON_LABELS, current_job, job_finished, remember_job, show_decoding_notes
+from pipeline import AUDIO_STAGES, TASKS, run_audio_job
+from workspace import QuotaExceeded, start_collector, workspaces
 import requests
-from typing import Iterator
-from io import StringIO
-import numpy as np
 import pathlib
-import os
-import torch
-from zipfile import ZipFile
-from io import BytesIO
 import base64
-import re
 
 st.set_page_config(page_title="Auto Transcriber", page_icon="🔊", layout="wide")
 
-torch.cuda.is_available()
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-loaded_model = whisper.load_model("small", device=DEVICE)
+start_warmup()
+start_collector()
 
 # Define a function that we can use to load lottie files from a link.
 @st.cache(allow_output_mutation=True)
@@ -30,14 +24,6 @@ def load_lottieurl(url: str):
     return r.json()
 
 
-APP_DIR = pathlib.Path(__file__).parent.absolute()
-
-LOCAL_DIR = APP_DIR / "local_audio"
-LOCAL_DIR.mkdir(exist_ok=True)
-save_dir = LOCAL_DIR / "output"
-save_dir.mkdir(exist_ok=True)
-
-
 col1, col2 = st.columns([1, 3])
 with col1:
     lottie = load_lottieurl("https://assets1.lottiefiles.com/packages/lf20_1xbk4d2v.json")
@@ -48,45 +34,25 @@ with col2:
     ## Auto Transcriber
     ##### Input an audio file and get a transcript.
     ###### ➠ If you want to transcribe the audio in its original language, select the task as "Transcribe"
-    ###### ➠ If you want to translate the transcription to English, select the task as "Translate" """)
+    ###### ➠ If you want to translate the transcription to English, select the task as "Translate"
+    ###### ➠ If you want both the transcription and an English translation, select the task as "Transcribe + Translate" """)
 
 
-def inferecence(loaded_model, uploaded_file, task):
-    with open(f"{save_dir}/input.mp3", "wb") as f:
-            f.write(uploaded_file.read())
-    audio = ffmpeg.input(f"{save_dir}/input.mp3")
-    audio = ffmpeg.output(audio, f"{save_dir}/output.wav", acodec="pcm_s16le", ac=1, ar="16k")
-    ffmpeg.run(audio, overwrite_output=True)
-    if task == "Transcribe":
-        options = dict(task="transcribe", best_of=5)
-        results = loaded_model.transcribe(f"{save_dir}/output.wav", **options)
-        vtt = getSubs(results["segments"], "vtt", 80)
-        srt = getSubs(results["segments"], "srt", 80)
-        lang = results["language"]
-        return results["text"], vtt, srt, lang
-    elif task == "Translate":
-        options = dict(task="translate", best_of=5)
-        results = loaded_model.transcribe(f"{save_dir}/output.wav", **options)
-        vtt = getSubs(results["segments"], "vtt", 80)
-        srt = getSubs(results["segments"], "srt", 80)
-        lang = results["language"]
-        return results["text"], vtt, srt, lang
-    else:
-        raise ValueError("Task not supported")
-
+def show_results(results):
+    show_decoding_notes(results)
+    col3, col4 = st.columns(2)
 
-def getSubs(segments: Iterator[dict], format: str, maxLineWidth: int) -> str:
-    segmentStream = StringIO()
+    with col3:
+        st.audio(results["audio"])
 
-    if format == 'vtt':
-        write_vtt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
-    elif format == 'srt':
-        write_srt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
-    else:
-        raise Exception("Unknown format " + format)
-
-    segmentStream.seek(0)
-    return segmentStream.read()
+    ZipfileDotZip = pathlib.Path(results["zip"]).name
+    with open(results["zip"], "rb") as f:
+        datazip = f.read()
+        b64 = base64.b64encode(datazip).decode()
+        href = f"<a href=\"data:file/zip;base64,{b64}\" download='{ZipfileDotZip}'>\
+        Download Transcripts\
+    </a>"
+    st.markdown(href, unsafe_allow_html=True)
 
 
 def main():
@@ -95,103 +61,37 @@ def main():
         filename = input_file.name[:-4]
     else:
         filename = None
-    task = st.selectbox("Select Task", ["Transcribe", "Translate"], index=0)
-    if task == "Transcribe":
-        if st.button("Transcribe"):
-            with st.spinner("Transcribing the audio..."):
-                results = inferecence(loaded_model, input_file, task)
-            col3, col4 = st.columns(2)
-            
-            with col3:
-                st.audio(input_file)
-                
-            # Split result["text"]  on !,? and . , but save the punctuation
-            sentences = re.split("([!?.])", results[0])
-            # Join the punctuation back to the sentences
-            sentences = ["".join(i) for i in zip(sentences[0::2], sentences[1::2])]
-            text = "\n\n".join(sentences)
-            with open("transcript.txt", "w+", encoding='utf8') as f:
-                f.writelines(text)
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.txt"), "rb") as f:
-                datatxt = f.read()
-                
-
-            with open("transcript.vtt", "w+",encoding='utf8') as f:
-                f.writelines(results[1])
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.vtt"), "rb") as f:
-                datavtt = f.read()
-                
-            with open("transcript.srt", "w+",encoding='utf8') as f:
-                f.writelines(results[2])
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.srt"), "rb") as f:
-                datasrt = f.read()
-            
-            zipObj = ZipFile("transcripts.zip", "w")
-            zipObj.write("transcript.txt")
-            zipObj.write("transcript.vtt")
-            zipObj.write("transcript.srt")
-            zipObj.close()
-            ZipfileDotZip = "transcripts.zip"
-            with open(ZipfileDotZip, "rb") as f:
-                datazip = f.read()
-                b64 = base64.b64encode(datazip).decode()
-                href = f"<a href=\"data:file/zip;base64,{b64}\" download='{ZipfileDotZip}'>\
-        Download Transcripts\
-    </a>"
-            st.markdown(href, unsafe_allow_html=True)
-
-    elif task == "Translate":
-        if st.button("Translate to English"):
-            with st.spinner("Translating to English..."):
-                results = inferecence(loaded_model, input_file, task)
-            col3, col4 = st.columns(2)
-
-            with col3:
-                st.audio(input_file)
-                
-            # Split result["text"]  on !,? and . , but save the punctuation
-            sentences = re.split("([!?.])", results[0])
-            # Join the punctuation back to the sentences
-            sentences = ["".join(i) for i in zip(sentences[0::2], sentences[1::2])]
-            text = "\n\n".join(sentences)
-            with open("transcript.txt", "w+", encoding='utf8') as f:
-                f.writelines(text)
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.txt"), "rb") as f:
-                datatxt = f.read()
-                
-
-            with open("transcript.vtt", "w+",encoding='utf8') as f:
-                f.writelines(results[1])
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.vtt"), "rb") as f:
-                datavtt = f.read()
-                
-            with open("transcript.srt", "w+",encoding='utf8') as f:
-                f.writelines(results[2])
-                f.close()
-            with open(os.path.join(os.getcwd(), "transcript.srt"), "rb") as f:
-                datasrt = f.read()
-                
-            zipObj = ZipFile("transcripts.zip", "w")
-            zipObj.write("transcript.txt")
-            zipObj.write("transcript.vtt")
-            zipObj.write("transcript.srt")
-            zipObj.close()
-            ZipfileDotZip = "transcripts.zip"
-            with open(ZipfileDotZip, "rb") as f:
-                datazip = f.read()
-                b64 = base64.b64encode(datazip).decode()
-                href = f"<a href=\"data:file/zip;base64,{b64}\" download='{ZipfileDotZip}'>\
-        Download Transcripts\
-    </a>"
-            st.markdown(href, unsafe_allow_html=True)
-    else:
-        st.error("Please select a task.")
+    task = st.selectbox("Select Task", list(TASKS), index=0)
+    profile = st.selectbox("Select Decoding Profile (adaptive decodes greedily and re-decodes only the doubtful segments)", list(PROFILES), index=1)
+    precision = st.selectbox("Select Precision (int8 and bf16 run faster on CPU at a small cost in accuracy)", supported_precisions(), index=0)
+    vad = st.checkbox("Skip silence and music before decoding", value=False)
+    if st.button(BUTTON_LABELS[task]):
+        if input_file is None:
+            st.error("Please upload an audio file.")
+            return
+        job_id = new_job_id()
+        try:
+            workspace = workspaces.create("audio", job_id, reserve_bytes=input_file.size)
+        except QuotaExceeded as e:
+            st.error(str(e))
+            return
+        input_name = "input" + pathlib.Path(input_file.name).suffix.lower()
+        with open(workspace.path(input_name), "wb") as f:
+            f.write(input_file.getbuffer())
+        get_manager().submit(
+            "audio",
+            run_audio_job,
+            {"size": "small", "task": task, "filename": input_name, "precision": precision, "profile": profile, "vad": vad},
+            AUDIO_STAGES,
+            job_id=job_id,
+        )
+        remember_job("audio", job_id)
+
+    # The job runs in the background; a rerun or reload reattaches to it.
+    job = current_job("audio")
+    if job is not None and job_finished(job):
+        show_results(job["result"])
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -9,6 +9,12 @@ import psutil
 import GPUtil
 import time
 import random
+import humanize
+from model_registry import registry
+from rerender import render_cache
+from result_cache import result_cache
+from workspace import workspaces
+from youtube_cache import youtube_cache
 
 st.set_page_config(page_title="Dashboard", page_icon="📊", layout="wide")
 
@@ -302,6 +308,62 @@ with col4:
     )
     st.caption(f"Used: {metrics['disk']['used']:.1f}GB / {metrics['disk']['total']:.1f}GB")
 
+# Model Cache Section
+st.markdown("### 🧠 Model Cache")
+col1, col2, col3, col4 = st.columns(4)
+
+model_stats = registry.stats()
+
+with col1:
+    st.metric(label="Cache Hits", value=model_stats['hits'])
+with col2:
+    st.metric(label="Cache Misses", value=model_stats['misses'])
+with col3:
+    st.metric(label="Evictions", value=model_stats['evictions'])
+with col4:
+    st.metric(label="Resident Models", value=len(model_stats['resident_models']))
+    st.caption(f"Used: {humanize.naturalsize(model_stats['resident_bytes'])} / {humanize.naturalsize(model_stats['budget_bytes'])}")
+
+cache_stats = result_cache.stats()
+st.caption(
+    f"Transcript cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+    f"{cache_stats['entries']} entries using {humanize.naturalsize(cache_stats['bytes'])} / {humanize.naturalsize(cache_stats['max_bytes'])}"
+)
+
+youtube_stats = youtube_cache.stats()
+st.caption(
+    f"YouTube cache: {youtube_stats['hits']} hits, {youtube_stats['misses']} misses; "
+    + ", ".join(
+        f"{kind} {humanize.naturalsize(youtube_stats['bytes'][kind])} / {humanize.naturalsize(limit)}"
+        for kind, limit in youtube_stats['limits'].items()
+    )
+)
+
+render_stats = render_cache.stats()
+st.caption(
+    f"Render cache: {render_stats['videos']} videos using {humanize.naturalsize(render_stats['bytes'])} / "
+    f"{humanize.naturalsize(render_stats['max_bytes'])}; {render_stats['reused_segments']} segments reused, "
+    f"{render_stats['rendered_segments']} re-encoded"
+)
+
+workspace_stats = workspaces.stats()
+reclaimed = workspace_stats['reclaimed_bytes']
+st.caption(
+    f"Job workspaces: {workspace_stats['workspaces']} using {humanize.naturalsize(workspace_stats['bytes'])} / "
+    f"{humanize.naturalsize(workspace_stats['quota_bytes'])}, removed after {humanize.naturaldelta(workspace_stats['ttl_seconds'])} unused. "
+    f"Reclaimed {humanize.naturalsize(sum(reclaimed.values()))} "
+    f"({', '.join(f'{reason}: {humanize.naturalsize(n)}' for reason, n in reclaimed.items())})"
+)
+
+if model_stats['load_seconds']:
+    st.dataframe(
+        pd.DataFrame(
+            [{"Model": k, "Load Time (s)": v} for k, v in model_stats['load_seconds'].items()]
+        ),
+        hide_index=True,
+        use_container_width=True
+    )
+
 # Create charts section
 st.markdown("### 📈 Activity Charts")
 
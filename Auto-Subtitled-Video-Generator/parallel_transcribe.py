@@ -0,0 +1,193 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from whisper.audio import HOP_LENGTH, N_SAMPLES, SAMPLE_RATE
+
+from decoding import fallback_summary
+
+# Worker processes used for long audio; 1 keeps transcription in-process.
+PARALLEL_WORKERS = int(os.environ.get("ANUVADIKA_PARALLEL_WORKERS", "1"))
+
+# Audio shorter than this is not worth splitting across processes.
+LONG_AUDIO_SECONDS = float(os.environ.get("ANUVADIKA_LONG_AUDIO_SECONDS", "600"))
+
+WINDOW_SECONDS = float(os.environ.get("ANUVADIKA_WINDOW_SECONDS", "240"))
+OVERLAP_SECONDS = float(os.environ.get("ANUVADIKA_OVERLAP_SECONDS", "8"))
+
+
+def split_windows(n_samples: int, window: int, overlap: int):
+    """
+    Split ``n_samples`` into ``(start, end)`` windows that overlap by ``overlap``.
+
+    The last window is merged into the previous one when it would be shorter
+    than the overlap, so no window is mostly duplicated audio.
+    """
+    if window <= overlap:
+        raise ValueError("window must be longer than overlap")
+    if n_samples <= window:
+        return [(0, n_samples)]
+    step = window - overlap
+    windows = []
+    start = 0
+    while start + window < n_samples:
+        windows.append((start, start + window))
+        start += step
+    if n_samples - start <= overlap:
+        windows[-1] = (windows[-1][0], n_samples)
+    else:
+        windows.append((start, n_samples))
+    return windows
+
+
+def stitch_segments(window_results, windows, overlap: int):
+    """
+    Merge per-window segments (already on the global timeline) into one list.
+
+    Each window owns the audio up to the middle of its overlap with the next
+    one; a segment is kept by the window that owns its midpoint, so the seam
+    is neither dropped nor duplicated.
+    """
+    merged = []
+    for i, (segments, (start, end)) in enumerate(zip(window_results, windows)):
+        own_start = 0.0 if i == 0 else (start + overlap / 2) / SAMPLE_RATE
+        own_end = math.inf if i == len(windows) - 1 else (end - overlap / 2) / SAMPLE_RATE
+        for segment in segments:
+            midpoint = (segment["start"] + segment["end"]) / 2
+            if own_start <= midpoint < own_end:
+                merged.append(segment)
+    for i, segment in enumerate(merged):
+        segment["id"] = i
+    return merged
+
+
+def _shift_segments(segments, offset_samples: int):
+    offset = offset_samples / SAMPLE_RATE
+    for segment in segments:
+        segment["start"] += offset
+        segment["end"] += offset
+        segment["seek"] += offset_samples // HOP_LENGTH
+        for word in segment.get("words", []):
+            word["start"] += offset
+            word["end"] += offset
+    return segments
+
+
+_worker_model = None
+
+
+def _init_worker(size: str, threads: int, precision: str):
+    global _worker_model
+    import torch
+    from model_registry import get_model
+
+    # Pin intra-op threads so N workers don't oversubscribe the cores.
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    _worker_model = get_model(size, device="cpu", precision=precision)
+
+
+def _detect_language(audio):
+    import whisper
+
+    if not _worker_model.is_multilingual:
+        return "en"
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), _worker_model.dims.n_mels)
+    _, probs = _worker_model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+
+def _worker_ready(_):
+    return os.getpid()
+
+
+def _transcribe_window(audio, offset_samples: int, profile: str, options: dict):
+    from decoding import transcribe_with_profile
+    from model_registry import decode_options_for, precision_context
+
+    with precision_context(_worker_model):
+        result = transcribe_with_profile(_worker_model, audio, profile, **options, **decode_options_for(_worker_model))
+    return _shift_segments(result["segments"], offset_samples)
+
+
+class TranscriptionPool:
+    """Worker processes each holding one CPU copy of a Whisper model."""
+
+    def __init__(self, size: str, workers: int, threads_per_worker: int = None, precision: str = "fp32"):
+        self.size = size
+        self.workers = workers
+        self.precision = precision
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(size, self.threads_per_worker, precision),
+        )
+
+    def transcribe(self, audio: np.ndarray, profile: str = "balanced", window_seconds: float = WINDOW_SECONDS,
+                   overlap_seconds: float = OVERLAP_SECONDS, **options):
+        """
+        Transcribe 16 kHz mono float32 PCM across the pool.
+
+        Returns a dict shaped like ``model.transcribe()``'s result.
+        """
+        overlap = int(overlap_seconds * SAMPLE_RATE)
+        windows = split_windows(len(audio), int(window_seconds * SAMPLE_RATE), overlap)
+        options = dict(options)
+        if options.get("language") is None:
+            # Detect once up front so every window decodes the same language.
+            options["language"] = self._executor.submit(_detect_language, audio[:N_SAMPLES]).result()
+        futures = [
+            self._executor.submit(_transcribe_window, audio[start:end], start, profile, options)
+            for start, end in windows
+        ]
+        segments = stitch_segments([future.result() for future in futures], windows, overlap)
+        result = {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": options["language"],
+        }
+        if profile == "adaptive":
+            result["decoding"] = fallback_summary(segments, profile)
+        return result
+
+    def warm(self):
+        """Start every worker and wait until each has loaded its model."""
+        return set(self._executor.map(_worker_ready, range(self.workers)))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def transcribe_parallel(audio: np.ndarray, size: str, workers: int = PARALLEL_WORKERS, precision: str = "fp32", **options):
+    """
+    Transcribe long audio on the shared pool.
+
+    The pool already saturates the CPU, so jobs take turns; a job asking for a
+    different model size or precision replaces the pool's workers.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (_pool.size, _pool.workers, _pool.precision) != (size, workers, precision):
+            _pool.shutdown()
+            _pool = None
+        if _pool is None:
+            _pool = TranscriptionPool(size, workers, precision=precision)
+        return _pool.transcribe(audio, **options)
+
+
+def use_parallel(audio, device: str) -> bool:
+    return (
+        PARALLEL_WORKERS > 1
+        and device == "cpu"
+        and isinstance(audio, np.ndarray)
+        and len(audio) / SAMPLE_RATE >= LONG_AUDIO_SECONDS
+    )
@@ -0,0 +1,758 @@
+import math
+import os
+import pathlib
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+from zipfile import ZipFile
+
+import ffmpeg
+import numpy as np
+import yt_dlp
+from whisper.audio import SAMPLE_RATE
+
+from bilingual import transcribe_and_translate
+from cascade import draft_sizes, transcribe_cascade
+from decoding import transcribe_with_profile
+from ingest import StreamingDownload, StreamingUnsupported
+from jobs import PROGRESS_INTERVAL_SECONDS
+from languages import iso_639_2
+from model_registry import DEVICE, decode_options_for, get_model, inference_lock, precision_context
+from parallel_transcribe import transcribe_parallel, use_parallel
+from result_cache import cache_key, result_cache
+from segments import BURN_SEGMENTS, keyframe_times, plan_segments, slice_cues
+from streaming import GrowingTranscriptStream, TranscriptStream
+from utils import getSubs, read_subtitles, write_srt, write_vtt
+from vad import SpeechTimeline
+from workspace import workspaces
+from youtube_cache import youtube_cache
+
+YOUTUBE_STAGES = ["download", "decode", "transcribe", "subtitle", "burn"]
+VIDEO_STAGES = ["decode", "transcribe", "subtitle", "burn"]
+AUDIO_STAGES = ["decode", "transcribe", "subtitle"]
+
+TASKS = {"Transcribe": "transcribe", "Translate": "translate", "Transcribe + Translate": "both"}
+
+# "soft" muxes the subtitles as a selectable track and copies video and audio
+# untouched; "burn" draws them into the picture, which re-encodes the video.
+SUBTITLE_MODES = {"Subtitle track (fast, no re-encode)": "soft", "Burned into the video": "burn"}
+
+# Subtitle codec for each output container; MP4 only carries mov_text.
+SUBTITLE_CODECS = {".mp4": "mov_text", ".m4v": "mov_text", ".mov": "mov_text", ".mkv": "webvtt", ".webm": "webvtt"}
+
+# Codecs an MP4 output can take as is. Uploads may be AVI or MKV saved as
+# input.mp4 (PCM, Vorbis, MJPEG...); anything else is re-encoded to H.264/AAC.
+MP4_CONTAINERS = (".mp4", ".m4v", ".mov")
+MP4_VIDEO_CODECS = {"h264", "hevc", "mpeg4", "av1", "vp9"}
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "alac"}
+
+# Proxy renders for checking subtitle placement: small, low quality and fast to encode.
+PREVIEW_HEIGHT = int(os.environ.get("ANUVADIKA_PREVIEW_HEIGHT", "360"))
+PREVIEW_CRF = int(os.environ.get("ANUVADIKA_PREVIEW_CRF", "32"))
+
+BURN_STYLE = "FontName=Arial,FontSize=24,PrimaryColour=&HFFFFFF&,OutlineColour=&H000000&,Outline=1"
+
+
+# ffmpeg writes "-progress" reports to stderr, interleaved with its error messages.
+PROGRESS_ARGS = ["-progress", "pipe:2", "-nostats", "-loglevel", "error"]
+
+
+def parse_ffmpeg_progress(lines, on_progress=None):
+    """
+    Read ffmpeg's ``-progress`` key=value blocks, calling ``on_progress`` with
+    the output position in seconds at the end of each block. Returns every
+    other line, i.e. ffmpeg's error messages.
+    """
+    errors = []
+    seconds = 0.0
+    for line in lines:
+        line = line.decode(errors="ignore").strip()
+        key, sep, value = line.partition("=")
+        if not sep or " " in key:
+            errors.append(line)
+        elif key == "out_time_us" and value.isdigit():
+            seconds = int(value) / 1e6
+        elif key == "progress" and on_progress is not None:
+            on_progress(seconds)
+    return "\n".join(errors)
+
+
+def run_ffmpeg(stream, cwd=None, on_progress=None):
+    """
+    Run an ffmpeg-python graph, raising with ffmpeg's stderr on failure.
+
+    ``on_progress`` is called with the output position in seconds. ffmpeg
+    never reads stdin, so processes run side by side from a terminal neither
+    steal keystrokes nor stop on SIGTTIN.
+    """
+    args = ffmpeg.compile(stream, overwrite_output=True)
+    process = subprocess.Popen([args[0], "-nostdin", *PROGRESS_ARGS, *args[1:]], cwd=cwd,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    errors = parse_ffmpeg_progress(process.stderr, on_progress)
+    if process.wait() != 0:
+        raise RuntimeError(f"FFmpeg failed with error: {errors}")
+
+
+def probe_duration(path):
+    """Media duration in seconds, or None if ffprobe cannot tell."""
+    try:
+        return float(ffmpeg.probe(str(path))["format"]["duration"])
+    except (ffmpeg.Error, KeyError, ValueError):
+        return None
+
+
+def probe_codecs(path):
+    """Codec names of the first video and audio streams of ``path``, None where there is none."""
+    streams = ffmpeg.probe(str(path))["streams"]
+    first = lambda kind: next((s.get("codec_name") for s in streams if s.get("codec_type") == kind), None)
+    return first("video"), first("audio")
+
+
+def copy_codec(codec, output, allowed, encoder):
+    """``"copy"`` when the container of ``output`` can hold ``codec`` as is, otherwise ``encoder``."""
+    if pathlib.Path(output).suffix.lower() not in MP4_CONTAINERS or codec in allowed:
+        return "copy"
+    return encoder
+
+
+def audio_streams(video_file, audio_codec, output):
+    """The audio of an input for ffmpeg.output, plus its codec option: copied whenever the output allows it."""
+    if audio_codec is None:
+        return [], {}
+    return [video_file.audio], {"acodec": copy_codec(audio_codec, output, MP4_AUDIO_CODECS, "aac")}
+
+
+def download_hook(job, stage, start=0.0, end=1.0):
+    """yt-dlp progress hook that maps byte counts onto part of a job stage."""
+    def hook(d):
+        total = d.get("total_bytes") or d.get("total_bytes_estimate")
+        if d.get("status") == "downloading" and total:
+            done = d.get("downloaded_bytes", 0)
+            job.report(stage, start + (end - start) * done / total, done=done, unit="B")
+    return hook
+
+
+def ffmpeg_hook(job, stage, duration):
+    """ffmpeg progress callback that maps the output position onto a job stage."""
+    def hook(seconds):
+        job.report(stage, seconds / duration if duration else 0.0, done=seconds, unit="s")
+    return hook
+
+
+def download_video(link, out_dir, progress_hook=None):
+    """
+    Fetch the video once. Its own audio track feeds the model and is kept
+    in the subtitled output, so nothing else is downloaded.
+    """
+    ydl_opts = {
+        'format': 'best[ext=mp4]',
+        'outtmpl': os.path.join(out_dir, 'youtube_video.mp4'),
+        'quiet': True,
+        'no_warnings': True,
+        'progress_hooks': [progress_hook] if progress_hook else [],
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([link])
+    return os.path.join(out_dir, 'youtube_video.mp4')
+
+
+def decode_audio(path, sr=SAMPLE_RATE, on_progress=None):
+    """
+    Decode an audio or video file to mono float32 PCM in a single ffmpeg process.
+
+    Raw s16le is read from ffmpeg's stdout into one buffer and converted in
+    place, so no WAV is written to disk and the audio is decoded only once.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", *PROGRESS_ARGS, "-threads", "0", "-i", str(path),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr), "-",
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    errors = []
+    # Progress goes to stderr; drain it alongside stdout so neither pipe fills up.
+    reader = threading.Thread(target=lambda: errors.append(parse_ffmpeg_progress(process.stderr, on_progress)), daemon=True)
+    reader.start()
+    buffer = bytearray()
+    while chunk := process.stdout.read(1 << 20):
+        buffer += chunk
+    reader.join()
+    if process.wait() != 0:
+        raise RuntimeError(f"FFmpeg failed with error: {errors[0] if errors else ''}")
+    audio = np.frombuffer(buffer, np.int16).astype(np.float32)
+    audio /= 32768.0
+    return audio
+
+
+def transcribe(size, audio, task, precision="fp32", profile="balanced", on_segment=None, draft_size=None, vad=False):
+    """
+    Transcribe 16 kHz audio (or a path to it) with the shared model.
+
+    When ``on_segment`` is given and the job runs in-process, segments are
+    streamed to it as each window is decoded. With ``draft_size`` the audio
+    is drafted by that model and only doubtful ranges are decoded by ``size``.
+    With ``vad`` only the speech regions are decoded; timestamps are mapped
+    back onto the original timeline.
+    """
+    if task not in TASKS:
+        raise ValueError("Task not supported")
+    options = dict(task=TASKS[task])
+    if isinstance(audio, str):
+        audio = decode_audio(audio)
+
+    key = _result_key(audio, size, options["task"], precision, profile, draft_size, vad)
+    results = result_cache.get(key)
+    if results is not None:
+        return results
+
+    timeline = None
+    if vad:
+        vad_start = time.perf_counter()
+        timeline = SpeechTimeline.detect(audio)
+        vad_seconds = time.perf_counter() - vad_start
+        if not timeline.regions:
+            # Nothing looked like speech; decode everything rather than guess.
+            timeline = None
+        else:
+            audio = timeline.audio
+            if on_segment is not None:
+                live = on_segment
+
+                def on_segment(segment):
+                    # Remap a copy; the stream's own segment is remapped with the result.
+                    live(timeline.remap(dict(segment)))
+    decode_start = time.perf_counter()
+
+    if draft_size and options["task"] == "both":
+        raise ValueError("Cascade mode supports Transcribe or Translate only")
+    if draft_size and draft_size not in draft_sizes(size):
+        raise ValueError(f"The draft model must be smaller than the {size} model, got {draft_size}")
+    if draft_size:
+        draft_model = get_model(draft_size, precision=precision)
+        final_model = get_model(size, precision=precision)
+        results = transcribe_cascade(draft_model, final_model, audio, options["task"], profile)
+    elif options["task"] == "both":
+        # One encoder pass feeds both decoders; see bilingual.py.
+        loaded_model = get_model(size, precision=precision)
+        with inference_lock(loaded_model), precision_context(loaded_model):
+            results = transcribe_and_translate(loaded_model, audio, profile=profile, on_segment=on_segment,
+                                               **decode_options_for(loaded_model))
+    elif use_parallel(audio, DEVICE):
+        results = transcribe_parallel(audio, size, precision=precision, profile=profile, **options)
+    else:
+        loaded_model = get_model(size, precision=precision)
+        with inference_lock(loaded_model), precision_context(loaded_model):
+            if on_segment is None:
+                results = transcribe_with_profile(loaded_model, audio, profile, **options, **decode_options_for(loaded_model))
+            else:
+                stream = TranscriptStream(loaded_model, audio, options["task"], profile=profile, **decode_options_for(loaded_model))
+                for segment in stream:
+                    on_segment(segment)
+                results = stream.result()
+    if timeline is not None:
+        timeline.remap_result(results)
+        results["vad"] = timeline.summary(vad_seconds, time.perf_counter() - decode_start)
+    result_cache.put(key, results)
+    return results
+
+
+def _result_key(audio, size, task, precision, profile, draft_size=None, vad=False):
+    return cache_key(audio, size, {"task": task, "precision": precision, "profile": profile, "draft_size": draft_size, "vad": vad})
+
+
+def can_stream(task, draft_size=None, vad=False):
+    """Whether a job's options allow transcribing while the media downloads."""
+    return TASKS[task] != "both" and not draft_size and not vad
+
+
+def transcribe_growing(size, source, task, precision="fp32", profile="balanced", on_segment=None):
+    """
+    Transcribe an ``ingest.GrowingAudio`` while it is still being decoded.
+
+    The model is locked one window at a time, so other jobs can use it while
+    this one waits for the download.
+    """
+    options = dict(task=TASKS[task])
+    loaded_model = get_model(size, precision=precision)
+    with precision_context(loaded_model):
+        stream = GrowingTranscriptStream(
+            loaded_model, source, options["task"], profile=profile, lock=inference_lock(loaded_model),
+            **decode_options_for(loaded_model),
+        )
+        for segment in stream:
+            if on_segment is not None:
+                on_segment(segment)
+    results = stream.result()
+    result_cache.put(_result_key(source.array(), size, options["task"], precision, profile), results)
+    return results
+
+
+def write_transcripts(results, out_dir, name="transcript"):
+    """
+    Write the .txt/.vtt/.srt transcripts for a result and return their paths.
+
+    An English translation produced alongside the transcript is written as
+    ``<name>_en.*`` and its paths returned under ``"translation"``.
+    """
+    # Split result["text"]  on !,? and . , but save the punctuation
+    sentences = re.split("([!?.])", results["text"])
+    # Join the punctuation back to the sentences
+    sentences = ["".join(i) for i in zip(sentences[0::2], sentences[1::2])]
+    paths = {
+        "txt": os.path.join(out_dir, f"{name}.txt"),
+        "vtt": os.path.join(out_dir, f"{name}.vtt"),
+        "srt": os.path.join(out_dir, f"{name}.srt"),
+    }
+    contents = {
+        "txt": "\n\n".join(sentences),
+        "vtt": getSubs(results["segments"], "vtt", 80),
+        "srt": getSubs(results["segments"], "srt", 80),
+    }
+    for kind, path in paths.items():
+        with open(path, "w", encoding="utf8") as f:
+            f.write(contents[kind])
+    if results.get("translation"):
+        paths["translation"] = write_transcripts(results["translation"], out_dir, f"{name}_en")
+    return paths
+
+
+def transcript_files(paths):
+    """Every file written by ``write_transcripts``, translation included."""
+    files = [paths[kind] for kind in ("txt", "vtt", "srt")]
+    if paths.get("translation"):
+        files += transcript_files(paths["translation"])
+    return files
+
+
+class LiveTranscript:
+    """
+    Appends segments to transcript.srt/.vtt as they are decoded and publishes
+    the growing transcript on the job, so pages can show it while the job runs
+    and the subtitles decoded so far survive a failed job.
+
+    Segments are written at most once per PROGRESS_INTERVAL_SECONDS; leaving
+    the ``with`` block writes whatever is left, whether or not the job failed.
+    """
+
+    def __init__(self, job, out_dir, duration):
+        self.job = job
+        self.duration = duration
+        self.paths = {"srt": os.path.join(out_dir, "transcript.srt"), "vtt": os.path.join(out_dir, "transcript.vtt")}
+        self.count = 0
+        self.text = ""
+        self.pending = []
+        self._last_flush = 0.0
+        # Start both files empty; a cache hit or a parallel run never appends.
+        for path in self.paths.values():
+            open(path, "w", encoding="utf8").close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def __call__(self, segment):
+        self.pending.append(segment)
+        self.text += segment["text"]
+        self.job.report("transcribe", segment["end"] / self.duration if self.duration else 0.0, done=segment["end"], unit="s")
+        if time.monotonic() - self._last_flush >= PROGRESS_INTERVAL_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """Append the segments received since the last flush and publish the transcript so far."""
+        if not self.pending:
+            return
+        with open(self.paths["srt"], "a", encoding="utf8") as srt:
+            write_srt(self.pending, file=srt, maxLineWidth=80, start=self.count + 1)
+        with open(self.paths["vtt"], "a", encoding="utf8") as vtt:
+            write_vtt(self.pending, file=vtt, maxLineWidth=80, header=self.count == 0)
+        self.count += len(self.pending)
+        position = self.pending[-1]["end"]
+        self.pending = []
+        self._last_flush = time.monotonic()
+        self.job.publish({"live": True, "text": self.text, "position": position, **self.paths})
+
+
+def subtitles_filter(stream, transcript, style=None):
+    """
+    Draw ``transcript`` onto ``stream``; every burn, full or preview, goes
+    through here so they all render the same way.
+
+    The filter is given a bare file name and ffmpeg must run from the
+    transcript's directory, so drive letters and separators never need
+    filter escaping.
+    """
+    options = {"force_style": style} if style else {}
+    return stream.filter("subtitles", pathlib.Path(transcript).name, **options)
+
+
+def burn_subtitles(video, transcript, output, style=None, on_progress=None):
+    """
+    Burn a subtitle file into a video.
+
+    Only the picture is re-encoded; the video's own audio stream is copied
+    untouched unless the output container cannot hold it.
+    """
+    # ffmpeg runs from the transcript's directory; resolve the other paths first.
+    video, output = pathlib.Path(video).absolute(), pathlib.Path(output).absolute()
+    transcript = pathlib.Path(transcript)
+    video_file = ffmpeg.input(str(video))
+    subtitled = subtitles_filter(video_file, transcript, style)
+    audio, options = audio_streams(video_file, probe_codecs(video)[1], output)
+    stream = ffmpeg.output(subtitled, *audio, str(output), **options)
+    run_ffmpeg(stream, cwd=transcript.parent, on_progress=on_progress)
+    return str(output)
+
+
+def burn_segment(video, cues, start, end, part, style=None, threads=0, on_progress=None):
+    """
+    Burn the cues visible in ``[start, end)`` into that stretch of ``video``,
+    written to ``part`` without audio. ``start`` must be a keyframe so the
+    segment can be decoded on its own.
+    """
+    part = pathlib.Path(part)
+    transcript = part.with_suffix(".srt")
+    with open(transcript, "w", encoding="utf-8") as f:
+        write_srt(slice_cues(cues, start, end), file=f)
+    stream = ffmpeg.input(str(pathlib.Path(video).absolute()), ss=start, t=end - start).video
+    stream = subtitles_filter(stream, transcript, style)
+    try:
+        run_ffmpeg(ffmpeg.output(stream, part.name, threads=threads), cwd=part.parent, on_progress=on_progress)
+    finally:
+        transcript.unlink(missing_ok=True)
+    return str(part)
+
+
+def join_segments(video, parts, output):
+    """
+    Join burned segments with the concat demuxer, copying the video as is
+    and the soundtrack from ``video``.
+    """
+    output = pathlib.Path(output)
+    listing = output.with_name(f"{output.stem}_parts.txt")
+    with open(listing, "w", encoding="utf-8") as f:
+        f.writelines(f"file '{pathlib.Path(part).absolute().as_posix()}'\n" for part in parts)
+    try:
+        joined = ffmpeg.input(str(listing), f="concat", safe=0)
+        audio, options = audio_streams(ffmpeg.input(str(video)), probe_codecs(video)[1], output)
+        stream = ffmpeg.output(joined.video, *audio, str(output), vcodec="copy", **options)
+        run_ffmpeg(stream)
+    finally:
+        listing.unlink(missing_ok=True)
+    return str(output)
+
+
+def burn_segments(video, cues, plan, parts, style=None, on_progress=None, max_workers=None):
+    """
+    Burn ``parts[i]`` for each ``plan[i]`` segment, one ffmpeg process each.
+
+    At most ``max_workers`` (and never more than the CPU count) run at once,
+    each given an equal share of the cores; the rest queue behind them.
+    """
+    cores = os.cpu_count() or 1
+    workers = max(1, min(len(plan), max_workers or len(plan), cores))
+    threads = max(1, cores // workers)
+    positions = [0.0] * len(plan)
+    lock = threading.Lock()
+
+    def burn(i):
+        def progress(seconds):
+            with lock:
+                positions[i] = seconds
+                done = sum(positions)
+            if on_progress:
+                on_progress(done)
+
+        start, end = plan[i]
+        burn_segment(video, cues, start, end, parts[i], style=style, threads=threads, on_progress=progress)
+
+    if plan:
+        with ThreadPoolExecutor(workers, thread_name_prefix="burn-segment") as pool:
+            list(pool.map(burn, range(len(plan))))
+
+
+def burn_subtitles_segmented(video, transcript, output, segments=BURN_SEGMENTS, style=None, on_progress=None):
+    """
+    Burn subtitles with one ffmpeg process per keyframe-aligned segment.
+
+    Each segment is cut from the source at a keyframe, burned with its own
+    time-shifted slice of the cues and encoded without audio; the pieces are
+    then joined with the concat demuxer and the original audio stream-copied
+    in the same pass, so nothing is encoded twice. Falls back to a single
+    process when the video is too short to split.
+    """
+    video, output = pathlib.Path(video), pathlib.Path(output)
+    duration = probe_duration(video)
+    plan = plan_segments(keyframe_times(video), duration, segments) if duration and segments > 1 else []
+    if len(plan) < 2:
+        return burn_subtitles(video, transcript, output, style=style, on_progress=on_progress)
+
+    with open(transcript, encoding="utf-8") as f:
+        cues = read_subtitles(f)
+    parts = [output.with_name(f"{output.stem}_part{i:03d}.mp4") for i in range(len(plan))]
+    try:
+        burn_segments(video, cues, plan, parts, style=style, on_progress=on_progress)
+        join_segments(video, parts, output)
+    finally:
+        for part in parts:
+            part.unlink(missing_ok=True)
+    return str(output)
+
+
+def preview_subtitles(video, transcript, output, start=0.0, end=None, style=None, on_progress=None):
+    """
+    Render a small, low-bitrate proxy of ``video`` with the subtitles burned
+    in, optionally only ``[start, end)``, with the fastest x264 preset.
+
+    The picture is downscaled before the subtitles are drawn; libass sizes
+    and positions them relative to the frame height, so placement and
+    styling match the full-resolution burn.
+    """
+    output = pathlib.Path(output)
+    with open(transcript, encoding="utf-8") as f:
+        cues = read_subtitles(f)
+    sliced = output.with_suffix(".srt")
+    with open(sliced, "w", encoding="utf-8") as f:
+        write_srt(slice_cues(cues, start, end if end is not None else math.inf), file=f)
+    options = {"ss": start} if start else {}
+    if end is not None:
+        options["t"] = end - start
+    video_file = ffmpeg.input(str(pathlib.Path(video).absolute()), **options)
+    picture = subtitles_filter(video_file.video.filter("scale", -2, PREVIEW_HEIGHT), sliced, style)
+    audio = [video_file.audio] if probe_codecs(video)[1] else []
+    stream = ffmpeg.output(picture, *audio, output.name, vcodec="libx264", preset="ultrafast", crf=PREVIEW_CRF,
+                           **({"acodec": "aac", "audio_bitrate": "64k", "ac": 1} if audio else {}))
+    try:
+        run_ffmpeg(stream, cwd=output.parent, on_progress=on_progress)
+    finally:
+        sliced.unlink(missing_ok=True)
+    return str(output)
+
+
+def mux_subtitles(video, tracks, output, on_progress=None):
+    """
+    Add subtitle files to a video as selectable tracks, all in one pass.
+
+    ``tracks`` is a list of ``(path, language)`` with whisper language codes;
+    each track is tagged with the ISO 639-2 code and the first is the
+    default. Video and audio are stream-copied, so this takes seconds
+    whatever the length of the video, unless the container of ``output``
+    cannot hold their codecs; those are re-encoded. The track codec follows
+    the container of ``output``.
+    """
+    output = pathlib.Path(output)
+    codec = SUBTITLE_CODECS.get(output.suffix.lower())
+    if codec is None:
+        raise ValueError(f"Cannot mux subtitles into a {output.suffix} file")
+    video_file = ffmpeg.input(str(video))
+    subtitles = [ffmpeg.input(str(path)) for path, _ in tracks]
+    metadata = {}
+    for i, (_, language) in enumerate(tracks):
+        metadata[f"metadata:s:s:{i}"] = f"language={iso_639_2(language)}"
+        metadata[f"disposition:s:{i}"] = "default" if i == 0 else "0"
+    video_codec, audio_codec = probe_codecs(video)
+    audio, options = audio_streams(video_file, audio_codec, output)
+    stream = ffmpeg.output(video_file.video, *audio, *subtitles, str(output), scodec=codec,
+                           vcodec=copy_codec(video_codec, output, MP4_VIDEO_CODECS, "libx264"), **options, **metadata)
+    run_ffmpeg(stream, on_progress=on_progress)
+    return str(output)
+
+
+def subtitle_tracks(transcripts, results, task):
+    """
+    ``(path, language)`` of every subtitle file a job wrote: the transcript
+    (English when the task was a translation) and the English translation
+    produced alongside it, if any.
+    """
+    language = "en" if TASKS[task] == "translate" else results["language"]
+    tracks = [(transcripts["srt"], language)]
+    if transcripts.get("translation"):
+        tracks.append((transcripts["translation"]["srt"], "en"))
+    return tracks
+
+
+def subtitle_video(video, tracks, output, mode="soft", style=None, on_progress=None):
+    """
+    Mux every track into ``video``, or burn the first one, according to one
+    of SUBTITLE_MODES.
+    """
+    if mode == "soft":
+        return mux_subtitles(video, tracks, output, on_progress=on_progress)
+    if mode == "burn":
+        return burn_subtitles_segmented(video, tracks[0][0], output, style=style, on_progress=on_progress)
+    raise ValueError(f"Unknown subtitle mode {mode}")
+
+
+def make_zip(zip_path, files):
+    with ZipFile(zip_path, "w") as zipObj:
+        for path in files:
+            zipObj.write(path, arcname=os.path.basename(path))
+    return zip_path
+
+
+def youtube_cache_key(link, size, task, precision="fp32", profile="balanced", draft_size=None, vad=False,
+                      subtitle_mode="soft"):
+    video_id = parse_qs(urlparse(link).query)["v"][0]
+    key = youtube_cache.key(video_id, size=size, task=task, precision=precision, profile=profile, draft_size=draft_size, vad=vad,
+                            subtitle_mode=subtitle_mode)
+    return video_id, key
+
+
+def cached_youtube_result(workspace, link, size, task, count_miss=True, **options):
+    """
+    The result of an identical earlier YouTube job, linked into ``workspace``,
+    or None. Streaming ingestion does not change the result, so it is not
+    part of the key.
+    """
+    video_id, key = youtube_cache_key(link, size, task, **options)
+    result = youtube_cache.get_result(key, video_id, workspace.dir, count_miss=count_miss)
+    if result is not None:
+        workspaces.finalize(workspace, youtube_outputs(result))
+    return result
+
+
+def youtube_outputs(result):
+    """Every file a finished YouTube job keeps: the video, the subtitled video, the zip and the transcripts."""
+    return [result["video"], result["subtitled_video"], result["zip"], *transcript_files(result)]
+
+
+def run_youtube_job(job, link, size, task, precision="fp32", profile="balanced", draft_size=None, vad=False, stream=False,
+                    subtitle_mode="soft"):
+    workspace = workspaces.get("youtube", job.id)
+    out_dir = workspace.dir
+    options = dict(precision=precision, profile=profile, draft_size=draft_size, vad=vad, subtitle_mode=subtitle_mode)
+    # The page checked before submitting; this catches a twin job that finished since.
+    cached = cached_youtube_result(workspace, link, size, task, count_miss=False, **options)
+    if cached is not None:
+        return cached
+    video_id, key = youtube_cache_key(link, size, task, **options)
+
+    job.report("download")
+    video = youtube_cache.get_media(video_id, out_dir)
+    results = None
+    if video is None and stream and can_stream(task, draft_size, vad):
+        # Decode and transcribe while the download is still running.
+        download = StreamingDownload(link, out_dir, download_hook(job, "download")).start()
+        job.report("transcribe")
+        try:
+            with LiveTranscript(job, out_dir, download.wait_metadata()) as live:
+                results = transcribe_growing(size, download.audio, task, precision, profile, on_segment=live)
+            duration = len(download.audio) / SAMPLE_RATE
+        except StreamingUnsupported:
+            # ffmpeg cannot demux every MP4 from a pipe (e.g. index at the end);
+            # finish the download and transcribe it the usual way.
+            results = None
+        video = download.wait_download()
+        youtube_cache.put_media(video_id, video)
+    elif video is None:
+        video = download_video(link, out_dir, download_hook(job, "download"))
+        youtube_cache.put_media(video_id, video)
+
+    if results is None:
+        job.report("decode")
+        pcm = decode_audio(video, on_progress=ffmpeg_hook(job, "decode", probe_duration(video)))
+        duration = len(pcm) / SAMPLE_RATE
+
+        job.report("transcribe")
+        with LiveTranscript(job, out_dir, duration) as live:
+            results = transcribe(size, pcm, task, precision, profile, on_segment=live, draft_size=draft_size, vad=vad)
+
+    result = finish_youtube_video(video, out_dir, results, duration, job.report, subtitle_mode, task)
+    workspaces.finalize(workspace, youtube_outputs(result))
+    youtube_cache.put_result(key, result)
+    return result
+
+
+def finish_youtube_video(video, out_dir, results, duration, report=None, subtitle_mode="soft", task="Transcribe"):
+    """Write the transcripts of a downloaded video, mux or burn them in and zip it all."""
+    if report:
+        report("subtitle")
+    transcripts = write_transcripts(results, out_dir)
+
+    on_progress = None
+    if report:
+        report("burn")
+        on_progress = lambda seconds: report("burn", seconds / duration if duration else 0.0, done=seconds, unit="s")
+    tracks = subtitle_tracks(transcripts, results, task)
+    subtitled = subtitle_video(video, tracks, pathlib.Path(out_dir) / "youtube_sub.mp4", subtitle_mode,
+                               on_progress=on_progress)
+    archive = make_zip(pathlib.Path(out_dir) / "YouTube_transcripts_and_video.zip", [*transcript_files(transcripts), subtitled])
+    return {
+        "text": results["text"],
+        "language": results["language"],
+        "decoding": results.get("decoding"),
+        "vad": results.get("vad"),
+        "cascade": results.get("cascade"),
+        "duration": duration,
+        "subtitle_mode": subtitle_mode,
+        "subtitle_languages": [language for _, language in tracks],
+        "video": video,
+        "subtitled_video": subtitled,
+        "zip": str(archive),
+        **transcripts,
+    }
+
+
+def run_video_job(job, size, task, precision="fp32", profile="balanced", vad=False, subtitle_mode="soft"):
+    workspace = workspaces.get("video", job.id)
+    out_dir = workspace.dir
+    video = str(out_dir / "input.mp4")
+
+    job.report("decode")
+    pcm = decode_audio(video, on_progress=ffmpeg_hook(job, "decode", probe_duration(video)))
+    duration = len(pcm) / SAMPLE_RATE
+
+    job.report("transcribe")
+    with LiveTranscript(job, out_dir, duration) as live:
+        results = transcribe(size, pcm, task, precision, profile, on_segment=live, vad=vad)
+
+    job.report("subtitle")
+    transcripts = write_transcripts(results, out_dir)
+
+    job.report("burn")
+    tracks = subtitle_tracks(transcripts, results, task)
+    subtitled = subtitle_video(video, tracks, out_dir / "final.mp4", subtitle_mode, style=BURN_STYLE,
+                               on_progress=ffmpeg_hook(job, "burn", duration))
+    workspaces.finalize(workspace, [video, subtitled, *transcript_files(transcripts)])
+
+    return {
+        "text": results["text"],
+        "language": results["language"],
+        "decoding": results.get("decoding"),
+        "vad": results.get("vad"),
+        "subtitle_mode": subtitle_mode,
+        "subtitle_languages": [language for _, language in tracks],
+        "video": video,
+        "subtitled_video": subtitled,
+        **transcripts,
+    }
+
+
+def run_audio_job(job, size, task, filename, precision="fp32", profile="balanced", vad=False):
+    workspace = workspaces.get("audio", job.id)
+    out_dir = workspace.dir
+
+    job.report("decode")
+    pcm = decode_audio(out_dir / filename, on_progress=ffmpeg_hook(job, "decode", probe_duration(out_dir / filename)))
+
+    job.report("transcribe")
+    with LiveTranscript(job, out_dir, len(pcm) / SAMPLE_RATE) as live:
+        results = transcribe(size, pcm, task, precision, profile, on_segment=live, vad=vad)
+
+    job.report("subtitle")
+    transcripts = write_transcripts(results, out_dir)
+    archive = make_zip(out_dir / "transcripts.zip", transcript_files(transcripts))
+    workspaces.finalize(workspace, [out_dir / filename, archive, *transcript_files(transcripts)])
+
+    return {
+        "text": results["text"],
+        "language": results["language"],
+        "decoding": results.get("decoding"),
+        "vad": results.get("vad"),
+        "audio": str(out_dir / filename),
+        "zip": str(archive),
+        **transcripts,
+    }
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import math
+import os
+import pathlib
+import shutil
+import threading
+
+from pipeline import burn_segments, join_segments, probe_duration
+from segments import BURN_SEGMENTS, keyframe_times, plan_segments, slice_cues
+from utils import read_subtitles
+
+APP_DIR = pathlib.Path(__file__).parent.absolute()
+
+CACHE_DIR = pathlib.Path(os.environ.get("ANUVADIKA_RENDER_CACHE_DIR", APP_DIR / "cache" / "renders"))
+
+# Total size of kept burned segments before the least recently rendered videos are evicted.
+RENDER_CACHE_MB = int(os.environ.get("ANUVADIKA_RENDER_CACHE_MB", "8192"))
+
+# Target segment length. Shorter segments mean less is re-encoded per edit
+# but more ffmpeg processes on the first render.
+SEGMENT_SECONDS = float(os.environ.get("ANUVADIKA_RERENDER_SEGMENT_SECONDS", "30"))
+
+# ffmpeg processes burning segments at once. A first render of an hour-long
+# video has about 120 segments; they queue behind this many.
+RENDER_WORKERS = int(os.environ.get("ANUVADIKA_RENDER_WORKERS", str(max(BURN_SEGMENTS, 2))))
+
+STATE = "render.json"
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Burned video segments and the cues they were burned with, per (video
+    hash, style).
+
+    Rendering a corrected transcript diffs its cues against the previous
+    render of the same video and re-encodes only the keyframe-aligned
+    segments whose cues changed; the rest are reused and everything is
+    spliced with the concat demuxer. Entries are directories whose mtimes
+    are LRU timestamps.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes: int = RENDER_CACHE_MB * 1024 * 1024,
+                 segment_seconds: float = SEGMENT_SECONDS, workers: int = RENDER_WORKERS):
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.segment_seconds = segment_seconds
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._entry_locks = {}
+        self.rendered_segments = 0
+        self.reused_segments = 0
+
+    @staticmethod
+    def key(video_hash: str, style=None) -> str:
+        digest = hashlib.sha256(json.dumps({"video": video_hash, "style": style}, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()[:32]
+
+    def _entry_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._entry_locks.setdefault(key, threading.Lock())
+
+    def _load(self, entry: pathlib.Path):
+        try:
+            with open(entry / STATE, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all((entry / part).exists() for part in state["parts"]):
+            return None
+        return state
+
+    def _plan(self, video):
+        duration = probe_duration(video)
+        if not duration:
+            raise RuntimeError(f"Cannot read the duration of {video}")
+        count = max(1, math.ceil(duration / self.segment_seconds))
+        return plan_segments(keyframe_times(video), duration, count, min_seconds=self.segment_seconds / 2)
+
+    def render(self, video, transcript, output, style=None) -> dict:
+        """
+        Burn ``transcript`` into ``video`` as ``output``, reusing every
+        segment whose cues are unchanged since the last render. Returns how
+        many segments there are and how many were re-encoded.
+        """
+        with open(transcript, encoding="utf-8") as f:
+            cues = read_subtitles(f)
+        key = self.key(file_digest(video), style)
+        entry = self.directory / key
+        with self._entry_lock(key):
+            entry.mkdir(parents=True, exist_ok=True)
+            state = self._load(entry)
+            if state is None:
+                plan = self._plan(video)
+                state = {"plan": plan, "parts": [f"part{i:04d}.mp4" for i in range(len(plan))], "cues": None}
+            plan = [tuple(segment) for segment in state["plan"]]
+            old = state["cues"]
+            changed = [i for i, (start, end) in enumerate(plan)
+                       if old is None or slice_cues(old, start, end) != slice_cues(cues, start, end)]
+
+            # Forget the old cues first, so a render that fails half way is redone in full.
+            self._save(entry, {**state, "cues": None})
+            burn_segments(video, cues, [plan[i] for i in changed], [entry / state["parts"][i] for i in changed],
+                          style=style, max_workers=self.workers)
+            join_segments(video, [entry / part for part in state["parts"]], output)
+            self._save(entry, {**state, "cues": cues})
+            self.rendered_segments += len(changed)
+            self.reused_segments += len(plan) - len(changed)
+        self.evict()
+        return {"segments": len(plan), "rerendered": len(changed)}
+
+    @staticmethod
+    def _save(entry: pathlib.Path, state: dict):
+        tmp = entry / f"{STATE}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, entry / STATE)
+
+    def entries(self):
+        if not self.directory.exists():
+            return []
+        return [(p, p.stat().st_mtime, sum(f.stat().st_size for f in p.iterdir() if f.is_file()))
+                for p in self.directory.iterdir() if p.is_dir()]
+
+    def evict(self):
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda e: e[1])
+            total = sum(size for _, _, size in entries)
+            for path, _, size in entries[:-1]:
+                if total <= self.max_bytes:
+                    break
+                lock = self._entry_locks.get(path.name)
+                if lock is not None and lock.locked():
+                    # Being rendered right now.
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        return {
+            "videos": len(entries),
+            "bytes": sum(size for _, _, size in entries),
+            "max_bytes": self.max_bytes,
+            "rendered_segments": self.rendered_segments,
+            "reused_segments": self.reused_segments,
+        }
+
+
+render_cache = RenderCache()
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import pathlib
+import threading
+
+APP_DIR = pathlib.Path(__file__).parent.absolute()
+
+CACHE_DIR = pathlib.Path(os.environ.get("ANUVADIKA_RESULT_CACHE_DIR", APP_DIR / "cache" / "transcripts"))
+
+# Total size of cached transcription results before the oldest are evicted.
+RESULT_CACHE_MB = int(os.environ.get("ANUVADIKA_RESULT_CACHE_MB", "512"))
+
+
+def cache_key(audio, size: str, options: dict) -> str:
+    """Hash of the decoded PCM plus everything that changes the model output."""
+    digest = hashlib.sha256()
+    digest.update(memoryview(audio).cast("B"))
+    digest.update(json.dumps({"size": size, **options}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Disk-backed cache of transcription results (segments, text, language, plus
+    decoding/cascade/VAD statistics and translation when present).
+
+    Entries are plain JSON files named by content hash, so they survive
+    restarts and are shared by every session. File mtimes double as LRU
+    timestamps: a hit touches the file and eviction removes the oldest.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes: int = RESULT_CACHE_MB * 1024 * 1024):
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {k: result[k] for k in ("text", "segments", "language", "decoding", "translation", "cascade", "vad") if k in result}
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self.evict()
+
+    def entries(self):
+        return [(p, p.stat()) for p in self.directory.glob("*/*.json")]
+
+    def evict(self):
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda e: e[1].st_mtime)
+            total = sum(stat.st_size for _, stat in entries)
+            for path, stat in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= stat.st_size
+
+    def stats(self) -> dict:
+        entries = self.entries() if self.directory.exists() else []
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,65 @@
+import bisect
+import os
+import subprocess
+
+# ffmpeg processes a hard burn is split across; 1 burns the whole file in one process.
+BURN_SEGMENTS = int(os.environ.get("ANUVADIKA_BURN_SEGMENTS", "1"))
+
+# Segments shorter than this are not worth their own ffmpeg process.
+MIN_SEGMENT_SECONDS = float(os.environ.get("ANUVADIKA_MIN_SEGMENT_SECONDS", "60"))
+
+
+def keyframe_times(video) -> list:
+    """
+    Presentation times of the video's keyframes, in seconds.
+
+    Read from the packet flags, so nothing is decoded.
+    """
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", str(video),
+    ]
+    process = subprocess.run(cmd, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"FFprobe failed with error: {process.stderr}")
+    times = []
+    for line in process.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            times.append(float(pts))
+    return sorted(times)
+
+
+def plan_segments(keyframes, duration: float, count: int, min_seconds: float = MIN_SEGMENT_SECONDS):
+    """
+    Split ``[0, duration)`` into at most ``count`` ``(start, end)`` segments
+    that each start on a keyframe, as close to equal length as the keyframes
+    allow. Cutting on keyframes lets each segment be decoded on its own and
+    the re-encoded pieces be joined without touching their neighbours.
+    """
+    count = max(1, min(count, int(duration // min_seconds) if min_seconds else count))
+    cuts = [0.0]
+    for i in range(1, count):
+        target = duration * i / count
+        index = bisect.bisect_left(keyframes, target)
+        nearest = min(keyframes[max(index - 1, 0):index + 1], key=lambda t: abs(t - target), default=None)
+        if nearest is not None and cuts[-1] < nearest < duration:
+            cuts.append(nearest)
+    return list(zip(cuts, cuts[1:] + [duration]))
+
+
+def slice_cues(cues, start: float, end: float):
+    """
+    The cues visible in ``[start, end)``, clipped to it and shifted so the
+    segment starts at zero.
+    """
+    sliced = []
+    for cue in cues:
+        if cue["end"] <= start or cue["start"] >= end:
+            continue
+        sliced.append({
+            **cue,
+            "start": max(cue["start"], start) - start,
+            "end": min(cue["end"], end) - start,
+        })
+    return sliced
@@ -0,0 +1,195 @@
+import contextlib
+
+import torch
+import whisper
+from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, SAMPLE_RATE
+from whisper.tokenizer import get_tokenizer
+
+from decoding import (
+    FALLBACK_TEMPERATURES, LOGPROB_THRESHOLD, NO_SPEECH_THRESHOLD, PROFILES, decode_with_fallback, fallback_summary,
+    refine_segment, split_timestamps,
+)
+
+# Decoder settings and fallback temperatures used per window for each profile.
+STREAM_PROFILES = {
+    "fast": (dict(temperature=0.0), ()),
+    "balanced": (dict(temperature=0.0), FALLBACK_TEMPERATURES),
+    "accurate": (dict(temperature=0.0, beam_size=5, patience=1.0), FALLBACK_TEMPERATURES),
+    "adaptive": (dict(temperature=0.0), ()),
+}
+
+# Whisper's decoder context is 448 tokens; half of it is left for the prompt.
+MAX_PROMPT_TOKENS = 223
+
+
+class TranscriptStream:
+    """
+    Incremental transcription: iterating yields ``transcribe()``-shaped
+    segments as soon as each 30 s window has been decoded.
+
+    ``result()`` returns the same dict ``model.transcribe()`` would once the
+    stream is exhausted, or whatever was decoded so far before that.
+    """
+
+    # Held around each window's decode; callers of this class lock the whole run.
+    _lock = contextlib.nullcontext()
+
+    def __init__(self, model, audio, task="transcribe", language=None, profile="balanced", fp16=None):
+        if profile not in PROFILES:
+            raise ValueError(f"Expected one of {list(PROFILES)}, got {profile}")
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+        self.model = model
+        self.audio = audio
+        self.task = task
+        self.profile = profile
+        self.fp16 = model.device.type == "cuda" if fp16 is None else fp16
+        self.duration = len(audio) / SAMPLE_RATE
+        self.segments = []
+
+        self._mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=N_SAMPLES)
+        if language is None:
+            if model.is_multilingual:
+                _, probs = model.detect_language(self._features(0))
+                language = max(probs[0], key=probs[0].get)
+            else:
+                language = "en"
+        self.language = language
+        self.tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages, language=language, task=task)
+
+    def _features(self, seek):
+        dtype = torch.float16 if self.fp16 else torch.float32
+        segment = whisper.pad_or_trim(self._mel[:, seek:seek + N_FRAMES], N_FRAMES).to(self.model.device).to(dtype)
+        with torch.no_grad():
+            return self.model.embed_audio(segment.unsqueeze(0))
+
+    def _content_frames(self, seek):
+        return self._mel.shape[-1] - N_FRAMES
+
+    def __iter__(self):
+        model = self.model
+        input_stride = N_FRAMES // model.dims.n_audio_ctx
+        base_options, temperatures = STREAM_PROFILES[self.profile]
+        prompt = []
+
+        seek = 0
+        while seek < (content_frames := self._content_frames(seek)):
+            segment_frames = min(N_FRAMES, content_frames - seek)
+            options = whisper.DecodingOptions(
+                task=self.task, language=self.language, fp16=self.fp16,
+                prompt=prompt[-MAX_PROMPT_TOKENS:] or None, **base_options,
+            )
+            with self._lock:
+                features = self._features(seek)
+                result = decode_with_fallback(model, features, options, temperatures)
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                seek += segment_frames
+                continue
+
+            spans, consumed = split_timestamps(result.tokens, self.tokenizer.timestamp_begin)
+            self._window_decoded(features, seek, segment_frames, consumed)
+            for segment in self._segments(result, spans, seek, segment_frames, self.task, len(self.segments)):
+                self.segments.append(segment)
+                yield segment
+
+            prompt = self._next_prompt(prompt, result)
+            seek += segment_frames if consumed is None else max(consumed * input_stride, 1)
+
+    def _window_decoded(self, features, seek, segment_frames, consumed):
+        """
+        Called with the encoder output of each window that holds speech, so
+        a subclass can decode more from it. ``consumed`` is how far the
+        transcript got into the window, in timestamp-token units, or None for all of it.
+        """
+
+    def _segments(self, result, spans, seek, segment_frames, task, first_id):
+        """``transcribe()``-shaped segments for the spans of one decoded window."""
+        time_offset = seek * HOP_LENGTH / SAMPLE_RATE
+        time_precision = N_FRAMES // self.model.dims.n_audio_ctx * HOP_LENGTH / SAMPLE_RATE
+        for start, end, text_tokens in spans:
+            text = self.tokenizer.decode(text_tokens)
+            if not text.strip():
+                continue
+            segment = {
+                "id": first_id,
+                "seek": seek,
+                "start": time_offset + start * time_precision,
+                "end": time_offset + (segment_frames * HOP_LENGTH / SAMPLE_RATE if end is None else end * time_precision),
+                "text": text,
+                "tokens": text_tokens,
+                "temperature": result.temperature,
+                "avg_logprob": result.avg_logprob,
+                "compression_ratio": result.compression_ratio,
+                "no_speech_prob": result.no_speech_prob,
+            }
+            if self.profile == "adaptive":
+                with self._lock:
+                    refine_segment(self.model, self.audio, segment, task, self.language, self.fp16)
+            first_id += 1
+            yield segment
+
+    def _next_prompt(self, prompt, result):
+        # Like whisper, condition on previous text unless the window needed a hot sample.
+        return [] if result.temperature > 0.5 else prompt + [t for t in result.tokens if t < self.tokenizer.eot]
+
+    def result(self) -> dict:
+        result = {
+            "text": "".join(segment["text"] for segment in self.segments),
+            "segments": self.segments,
+            "language": self.language,
+        }
+        if self.profile == "adaptive":
+            result["decoding"] = fallback_summary(self.segments, self.profile)
+        return result
+
+
+class GrowingTranscriptStream(TranscriptStream):
+    """
+    A ``TranscriptStream`` over audio that is still arriving (an
+    ``ingest.GrowingAudio``). Each 30 s window is decoded as soon as its
+    samples are complete, with its mel spectrogram computed from that window
+    alone. ``lock`` is held only while decoding, never while waiting for audio.
+    """
+
+    def __init__(self, model, source, task="transcribe", language=None, profile="balanced", fp16=None, lock=None):
+        if profile not in PROFILES:
+            raise ValueError(f"Expected one of {list(PROFILES)}, got {profile}")
+        self.model = model
+        self.source = source
+        self.task = task
+        self.profile = profile
+        self.fp16 = model.device.type == "cuda" if fp16 is None else fp16
+        self.segments = []
+        if lock is not None:
+            self._lock = lock
+
+        if language is None:
+            if model.is_multilingual:
+                source.wait(N_SAMPLES)
+                with self._lock:
+                    _, probs = model.detect_language(self._features(0))
+                language = max(probs[0], key=probs[0].get)
+            else:
+                language = "en"
+        self.language = language
+        self.tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages, language=language, task=task)
+
+    @property
+    def audio(self):
+        return self.source.array()
+
+    @property
+    def duration(self):
+        return len(self.source) / SAMPLE_RATE
+
+    def _content_frames(self, seek):
+        # Blocks until the window starting at ``seek`` is complete or the audio has ended.
+        return self.source.wait((seek + N_FRAMES) * HOP_LENGTH) // HOP_LENGTH
+
+    def _features(self, seek):
+        start = seek * HOP_LENGTH
+        mel = whisper.log_mel_spectrogram(self.audio[start:start + N_SAMPLES], self.model.dims.n_mels, padding=N_SAMPLES)
+        dtype = torch.float16 if self.fp16 else torch.float32
+        segment = whisper.pad_or_trim(mel, N_FRAMES).to(self.model.device).to(dtype)
+        with torch.no_grad():
+            return self.model.embed_audio(segment.unsqueeze(0))
@@ -1,5 +1,7 @@
+import re
 import textwrap
 import zlib
+from io import StringIO
 from typing import Iterator, TextIO
 
 
@@ -50,8 +52,9 @@ def write_txt(transcript: Iterator[dict], file: TextIO):
         print(segment['text'].strip(), file=file, flush=True)
 
 
-def write_vtt(transcript: Iterator[dict], file: TextIO, maxLineWidth=None):
-    print("WEBVTT\n", file=file)
+def write_vtt(transcript: Iterator[dict], file: TextIO, maxLineWidth=None, header: bool = True):
+    if header:
+        print("WEBVTT\n", file=file)
     for segment in transcript:
         text = processText(segment['text'], maxLineWidth).replace('-->', '->')
 
@@ -63,7 +66,7 @@ def write_vtt(transcript: Iterator[dict], file: TextIO, maxLineWidth=None):
         )
 
 
-def write_srt(transcript: Iterator[dict], file: TextIO, maxLineWidth=None):
+def write_srt(transcript: Iterator[dict], file: TextIO, maxLineWidth=None, start: int = 1):
     """
     Write a transcript to a file in SRT format.
     Example usage:
@@ -74,8 +77,12 @@ def write_srt(transcript: Iterator[dict], file: TextIO, maxLineWidth=None):
         audio_basename = Path(audio_path).stem
         with open(Path(output_dir) / (audio_basename + ".srt"), "w", encoding="utf-8") as srt:
             write_srt(result["segments"], file=srt)
+
+    Segments are flushed one at a time, so ``transcript`` can be a generator.
+    To append to a file that already holds cues, pass the next cue number
+    as ``start`` (and ``header=False`` to ``write_vtt``).
     """
-    for i, segment in enumerate(transcript, start=1):
+    for i, segment in enumerate(transcript, start=start):
         text = processText(segment['text'].strip(), maxLineWidth).replace('-->', '->')
 
         # write srt lines
@@ -88,9 +95,82 @@ def write_srt(transcript: Iterator[dict], file: TextIO, maxLineWidth=None):
             flush=True,
         )
 
+TIMESTAMP = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})")
+
+
+def parse_timestamp(text: str) -> float:
+    match = TIMESTAMP.search(text)
+    if match is None:
+        raise ValueError(f"Not a subtitle timestamp: {text}")
+    hours, minutes, seconds, fraction = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(fraction.ljust(3, "0")) / 1000
+
+
+def read_subtitles(file: TextIO):
+    """
+    Read SRT or WebVTT cues as ``{"start", "end", "text"}`` segments, the
+    shape ``write_srt`` and ``write_vtt`` take.
+    """
+    segments = []
+    for block in re.split(r"\n\s*\n", file.read().replace("\r\n", "\n").strip()):
+        lines = block.split("\n")
+        for i, line in enumerate(lines):
+            if "-->" in line:
+                start, end = line.split("-->", 1)
+                segments.append({
+                    "start": parse_timestamp(start),
+                    "end": parse_timestamp(end),
+                    "text": "\n".join(lines[i + 1:]),
+                })
+                break
+    return segments
+
+
 def processText(text: str, maxLineWidth=None):
     if (maxLineWidth is None or maxLineWidth < 0):
         return text
 
     lines = textwrap.wrap(text, width=maxLineWidth, tabsize=4)
     return '\n'.join(lines)
+
+
+def getSubs(segments: Iterator[dict], format: str, maxLineWidth: int) -> str:
+    segmentStream = StringIO()
+
+    if format == 'vtt':
+        write_vtt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
+    elif format == 'srt':
+        write_srt(segments, file=segmentStream, maxLineWidth=maxLineWidth)
+    else:
+        raise Exception("Unknown format " + format)
+
+    segmentStream.seek(0)
+    return segmentStream.read()
+
+
+def validate_youtube_url(url):
+    # Remove any whitespace
+    url = url.strip()
+    
+    # Handle direct video IDs
+    if len(url) == 11 and all(c.isalnum() or c in '-_' for c in url):
+        return f"https://www.youtube.com/watch?v={url}"
+    
+    # Handle various YouTube URL formats
+    patterns = [
+        r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([^&]+)',
+        r'(?:https?://)?(?:www\.)?youtube\.com/embed/([^/?]+)',
+        r'(?:https?://)?(?:www\.)?youtube\.com/v/([^/?]+)',
+        r'(?:https?://)?(?:www\.)?youtu\.be/([^/?]+)',
+        r'(?:https?://)?(?:www\.)?youtube\.com/shorts/([^/?]+)'
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            video_id = match.group(1)
+            # Validate video ID format
+            if len(video_id) == 11 and all(c.isalnum() or c in '-_' for c in video_id):
+                return f"https://www.youtube.com/watch?v={video_id}"
+    
+    return None
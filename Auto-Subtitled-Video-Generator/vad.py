@@ -0,0 +1,157 @@
+import os
+
+import numpy as np
+from whisper.audio import SAMPLE_RATE
+
+FRAME_SECONDS = 0.03
+FRAME_SAMPLES = int(FRAME_SECONDS * SAMPLE_RATE)
+# Frames analysed per FFT batch (300 s of audio).
+BLOCK_FRAMES = 10_000
+
+# A frame is loud enough for speech this far above the noise floor
+# (the 10th percentile of frame energies), and never below the absolute floor.
+ENERGY_MARGIN_DB = float(os.environ.get("ANUVADIKA_VAD_MARGIN_DB", "12"))
+ENERGY_FLOOR_DB = -60.0
+# Share of a frame's energy that must fall in the 300-3400 Hz speech band.
+SPEECH_BAND = (300, 3400)
+SPEECH_BAND_RATIO = 0.45
+# Speech is syllabic: its frame energy swings by several dB every few hundred
+# milliseconds. Long regions steadier than this are music beds or tones.
+MIN_MODULATION_DB = 4.0
+MUSIC_MIN_SECONDS = 5.0
+
+SMOOTH_SECONDS = 0.3
+MIN_SPEECH_SECONDS = 0.25
+MIN_SILENCE_SECONDS = float(os.environ.get("ANUVADIKA_VAD_MIN_SILENCE", "1.0"))
+PAD_SECONDS = 0.2
+# Silence kept between speech regions once they are packed together, so the
+# model still sees a pause where the cut was.
+GAP_SECONDS = 0.3
+
+
+def frame_features(audio: np.ndarray):
+    """Per-frame energy (dB) and speech-band energy ratio, for whole frames only."""
+    n_frames = len(audio) // FRAME_SAMPLES
+    frames = audio[:n_frames * FRAME_SAMPLES].reshape(n_frames, FRAME_SAMPLES)
+    window = np.hanning(FRAME_SAMPLES).astype(np.float32)
+    freqs = np.fft.rfftfreq(FRAME_SAMPLES, 1 / SAMPLE_RATE)
+    band = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    band_ratio = np.empty(n_frames, dtype=np.float32)
+    # In blocks, so the FFT temporaries stay a few tens of MB however long the recording is.
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES].astype(np.float32)
+        energy_db[start:start + len(block)] = 10 * np.log10(np.mean(block ** 2, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(block * window, axis=1)) ** 2
+        band_ratio[start:start + len(block)] = power[:, band].sum(axis=1) / (power.sum(axis=1) + 1e-10)
+    return energy_db, band_ratio
+
+
+def _runs(mask: np.ndarray):
+    """``(start, end)`` frame indices of each run of True in a boolean mask."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def speech_regions(audio: np.ndarray):
+    """
+    Time ranges, in seconds, that look like speech.
+
+    Frames are kept when they are both loud and speech-band heavy; the mask is
+    smoothed, long steady stretches are dropped as music, and the regions are
+    padded and merged across short pauses.
+    """
+    if len(audio) < FRAME_SAMPLES:
+        return []
+    energy_db, band_ratio = frame_features(audio)
+    threshold = max(np.percentile(energy_db, 10) + ENERGY_MARGIN_DB, ENERGY_FLOOR_DB)
+    voiced = (energy_db > threshold) & (band_ratio > SPEECH_BAND_RATIO)
+
+    width = max(int(SMOOTH_SECONDS / FRAME_SECONDS), 1)
+    voiced = np.convolve(voiced, np.ones(width) / width, mode="same") > 0.5
+
+    pad = int(PAD_SECONDS / FRAME_SECONDS)
+    regions = []
+    for start, end in _runs(voiced):
+        seconds = (end - start) * FRAME_SECONDS
+        if seconds < MIN_SPEECH_SECONDS:
+            continue
+        if seconds >= MUSIC_MIN_SECONDS and np.std(energy_db[start:end]) < MIN_MODULATION_DB:
+            continue
+        start, end = max(start - pad, 0), min(end + pad, len(energy_db))
+        if regions and (start - regions[-1][1]) * FRAME_SECONDS < MIN_SILENCE_SECONDS:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    total = len(audio) / SAMPLE_RATE
+    return [(start * FRAME_SECONDS, min(end * FRAME_SECONDS, total)) for start, end in regions]
+
+
+class SpeechTimeline:
+    """
+    The speech regions of a recording packed into one shorter clip, and the
+    mapping from times in that clip back to the original timeline.
+    """
+
+    def __init__(self, audio: np.ndarray, regions):
+        self.duration = len(audio) / SAMPLE_RATE
+        self.regions = regions
+        gap = np.zeros(int(GAP_SECONDS * SAMPLE_RATE), dtype=audio.dtype)
+        pieces, packed, original = [], [], []
+        position = 0.0
+        for start, end in regions:
+            piece = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+            if pieces:
+                pieces.append(gap)
+                position += GAP_SECONDS
+            pieces.append(piece)
+            packed += [position, position + len(piece) / SAMPLE_RATE]
+            original += [start, start + len(piece) / SAMPLE_RATE]
+            position += len(piece) / SAMPLE_RATE
+        self.audio = np.concatenate(pieces) if pieces else audio[:0]
+        self._packed = np.array(packed)
+        self._original = np.array(original)
+
+    @classmethod
+    def detect(cls, audio: np.ndarray):
+        return cls(audio, speech_regions(audio))
+
+    @property
+    def speech_seconds(self) -> float:
+        return sum(end - start for start, end in self.regions)
+
+    @property
+    def skipped_fraction(self) -> float:
+        return 1 - self.speech_seconds / self.duration if self.duration else 0.0
+
+    def to_original(self, times):
+        """Map times in the packed clip to the original timeline."""
+        if not len(self._packed):
+            return times
+        return np.interp(times, self._packed, self._original)
+
+    def remap(self, segment):
+        segment["start"], segment["end"] = (float(t) for t in self.to_original([segment["start"], segment["end"]]))
+        for word in segment.get("words", []):
+            word["start"], word["end"] = (float(t) for t in self.to_original([word["start"], word["end"]]))
+        return segment
+
+    def remap_result(self, result):
+        for segment in result["segments"]:
+            self.remap(segment)
+        if result.get("translation"):
+            self.remap_result(result["translation"])
+        return result
+
+    def summary(self, vad_seconds: float, decode_seconds: float) -> dict:
+        """Skipped fraction and the speedup over decoding the whole recording,
+        extrapolated from the measured decode speed on the packed clip."""
+        packed = len(self.audio) / SAMPLE_RATE
+        full = decode_seconds * self.duration / packed if packed else None
+        return {
+            "skipped_fraction": self.skipped_fraction,
+            "regions": len(self.regions),
+            "vad_seconds": vad_seconds,
+            "decode_seconds": decode_seconds,
+            "estimated_speedup": full / (vad_seconds + decode_seconds) if full else None,
+        }
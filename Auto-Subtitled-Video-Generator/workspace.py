@@ -0,0 +1,317 @@
+import json
+import logging
+import math
+import os
+import pathlib
+import shutil
+import threading
+import time
+
+from jobs import QUEUED, RUNNING, get_manager
+
+APP_DIR = pathlib.Path(__file__).parent.absolute()
+
+WORKSPACE_DIR = pathlib.Path(os.environ.get("ANUVADIKA_WORKSPACE_DIR", APP_DIR / "workspaces"))
+
+# Workspaces not opened for this long are removed, unless their job is still running.
+WORKSPACE_TTL_HOURS = float(os.environ.get("ANUVADIKA_WORKSPACE_TTL_HOURS", "24"))
+
+# Total disk space all workspaces may use. The least recently used finished
+# workspaces are evicted to stay under it; new jobs are refused if that is not enough.
+WORKSPACE_QUOTA_MB = int(os.environ.get("ANUVADIKA_WORKSPACE_QUOTA_MB", "20480"))
+
+# How often the background collector runs.
+GC_INTERVAL_SECONDS = float(os.environ.get("ANUVADIKA_GC_INTERVAL_SECONDS", "300"))
+
+# A workspace with no job record (the transcript page renders inline, and pages
+# create the workspace just before submitting) is treated as busy for this long
+# unless it has been finalized.
+UNFINALIZED_GRACE_SECONDS = 3600
+
+# Output trees written by the pages before jobs had workspaces; the collector
+# removes entries in them once they pass the TTL.
+LEGACY_DIRS = [APP_DIR / name / "output" for name in ("local", "local_youtube", "local_audio", "local_transcript")]
+
+LAST_ACCESS = ".last_access"
+MANIFEST = ".final.json"
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+class Workspace:
+    """
+    The private directory of one job. Every artifact the job reads or writes
+    lives here, so jobs running side by side never share a file name.
+    """
+
+    def __init__(self, root, kind: str, job_id: str):
+        self.kind = kind
+        self.job_id = job_id
+        self.dir = pathlib.Path(root) / kind / job_id
+
+    def path(self, name: str) -> pathlib.Path:
+        if pathlib.Path(name).name != name:
+            raise ValueError(f"Artifact names must be plain file names, got {name}")
+        return self.dir / name
+
+    def exists(self) -> bool:
+        return self.dir.is_dir()
+
+    def touch(self):
+        """Mark the workspace as used now, restarting its TTL."""
+        if self.exists():
+            self.path(LAST_ACCESS).touch()
+
+    @property
+    def last_access(self) -> float:
+        try:
+            return self.path(LAST_ACCESS).stat().st_mtime
+        except OSError:
+            return _mtime(self.dir)
+
+    @property
+    def finalized(self) -> bool:
+        return self.path(MANIFEST).exists()
+
+    def final_outputs(self):
+        try:
+            with open(self.path(MANIFEST), encoding="utf-8") as f:
+                return set(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def _relative(self, path) -> str:
+        path = pathlib.Path(path)
+        try:
+            return path.relative_to(self.dir).as_posix()
+        except ValueError:
+            return path.name
+
+    def finalize(self, paths):
+        """
+        Record the job's final outputs; every other file is an intermediate.
+
+        Outputs are stored relative to the workspace, so jobs that keep files
+        in subdirectories (a batch keeps one per video) are covered too.
+        """
+        names = sorted({self._relative(p) for p in paths})
+        with open(self.path(MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(names, f)
+
+    def intermediates(self):
+        final = self.final_outputs()
+        if final is None:
+            return []
+        return [p for p in self.dir.rglob("*")
+                if p.is_file() and self._relative(p) not in final and self._relative(p) not in (LAST_ACCESS, MANIFEST)]
+
+    def size(self) -> int:
+        return _tree_size(self.dir)
+
+    def remove(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class WorkspaceManager:
+    """
+    Creates per-job workspaces and garbage-collects them: intermediates are
+    reclaimed once a job's final outputs exist, unused workspaces expire after
+    the TTL, and the least recently used are evicted to stay under the quota.
+    """
+
+    def __init__(self, root=WORKSPACE_DIR, ttl_seconds: float = WORKSPACE_TTL_HOURS * 3600,
+                 quota_bytes: int = WORKSPACE_QUOTA_MB * 1024 * 1024, legacy_dirs=LEGACY_DIRS):
+        self.root = pathlib.Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = quota_bytes
+        self.legacy_dirs = [pathlib.Path(d) for d in legacy_dirs]
+        self._lock = threading.RLock()
+        self.reclaimed_bytes = {"intermediate": 0, "expired": 0, "evicted": 0, "legacy": 0}
+        self.last_collect = None
+
+    def get(self, kind: str, job_id: str) -> Workspace:
+        return Workspace(self.root, kind, job_id)
+
+    def create(self, kind: str, job_id: str, reserve_bytes: int = 0) -> Workspace:
+        """
+        Create the workspace for a new job, first expiring and evicting old ones.
+
+        Raises ``QuotaExceeded`` if ``reserve_bytes`` (e.g. the upload about
+        to be written) still would not fit in the quota.
+        """
+        with self._lock:
+            self.sweep()
+            used = self.evict(reserve_bytes)
+            if used + reserve_bytes > self.quota_bytes:
+                raise QuotaExceeded(
+                    f"Workspace quota of {self.quota_bytes // 2**20} MB is full "
+                    f"({used // 2**20} MB in use); try again once running jobs finish."
+                )
+            workspace = self.get(kind, job_id)
+            workspace.dir.mkdir(parents=True)
+            workspace.touch()
+            return workspace
+
+    def finalize(self, workspace: Workspace, paths) -> int:
+        """Record a job's final outputs and reclaim its intermediates right away."""
+        with self._lock:
+            workspace.finalize(paths)
+            return self.reclaim(workspace)
+
+    def workspaces(self):
+        if not self.root.exists():
+            return []
+        return [Workspace(self.root, kind.name, job.name)
+                for kind in self.root.iterdir() if kind.is_dir()
+                for job in kind.iterdir() if job.is_dir()]
+
+    def usage(self) -> int:
+        return sum(workspace.size() for workspace in self.workspaces())
+
+    def is_active(self, workspace: Workspace) -> bool:
+        job = get_manager().get(workspace.job_id)
+        if job is not None:
+            return job["status"] in (QUEUED, RUNNING)
+        return not workspace.finalized and time.time() - workspace.last_access < UNFINALIZED_GRACE_SECONDS
+
+    def reclaim(self, workspace: Workspace) -> int:
+        """Delete the intermediates of a finalized workspace; return the bytes freed."""
+        freed = 0
+        for path in workspace.intermediates():
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                # Already gone: removed by its job, a cache eviction or another collector.
+                continue
+            freed += size
+        self.reclaimed_bytes["intermediate"] += freed
+        return freed
+
+    def _remove(self, workspace: Workspace, reason: str) -> int:
+        size = workspace.size()
+        workspace.remove()
+        self.reclaimed_bytes[reason] += size
+        return size
+
+    def sweep(self) -> int:
+        """Remove workspaces past their TTL that are not in use; return how many."""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for workspace in self.workspaces():
+            if workspace.last_access < cutoff and not self.is_active(workspace):
+                self._remove(workspace, "expired")
+                removed += 1
+        return removed
+
+    def evict(self, reserve_bytes: int = 0) -> int:
+        """
+        Remove the least recently used idle workspaces until ``reserve_bytes``
+        more fit in the quota. Returns the usage afterwards.
+        """
+        entries = [(workspace, workspace.size()) for workspace in self.workspaces()]
+        used = sum(size for _, size in entries)
+        idle = sorted((e for e in entries if not self.is_active(e[0])), key=lambda e: e[0].last_access)
+        if used - sum(size for _, size in idle) + reserve_bytes > self.quota_bytes:
+            # Even evicting everything idle would not make room; keep it.
+            return used
+        for workspace, size in idle:
+            if used + reserve_bytes <= self.quota_bytes:
+                break
+            self._remove(workspace, "evicted")
+            used -= size
+        return used
+
+    def sweep_legacy(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for directory in self.legacy_dirs:
+            if not directory.is_dir():
+                continue
+            for path in directory.iterdir():
+                if _mtime(path) >= cutoff:
+                    continue
+                size = _tree_size(path) if path.is_dir() else _file_size(path)
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+                self.reclaimed_bytes["legacy"] += size
+                removed += 1
+        return removed
+
+    def collect(self):
+        """One full garbage-collection pass."""
+        with self._lock:
+            for workspace in self.workspaces():
+                if workspace.finalized:
+                    self.reclaim(workspace)
+            self.sweep()
+            self.evict()
+            self.sweep_legacy()
+            self.last_collect = time.time()
+
+    def stats(self) -> dict:
+        workspaces = self.workspaces()
+        return {
+            "workspaces": len(workspaces),
+            "bytes": sum(workspace.size() for workspace in workspaces),
+            "quota_bytes": self.quota_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "reclaimed_bytes": dict(self.reclaimed_bytes),
+            "last_collect": self.last_collect,
+        }
+
+
+def _file_size(path: pathlib.Path) -> int:
+    # Files can disappear under a running job or another collector; count them as empty.
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _mtime(path: pathlib.Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return math.inf
+
+
+def _tree_size(path: pathlib.Path) -> int:
+    return sum(_file_size(p) for p in path.rglob("*") if p.is_file())
+
+
+workspaces = WorkspaceManager()
+
+_collector_thread = None
+_collector_lock = threading.Lock()
+
+
+def _collect_forever(manager, interval):
+    while True:
+        try:
+            manager.collect()
+        except Exception:
+            logger.exception("Workspace garbage collection failed")
+        time.sleep(interval)
+
+
+def start_collector(interval: float = GC_INTERVAL_SECONDS):
+    """
+    Run the workspace garbage collector on a daemon thread.
+
+    Safe to call from every page on every rerun: only the first call starts a thread.
+    """
+    global _collector_thread
+    with _collector_lock:
+        if _collector_thread is None:
+            _collector_thread = threading.Thread(
+                target=_collect_forever, args=(workspaces, interval), name="workspace-gc", daemon=True
+            )
+            _collector_thread.start()
+        return _collector_thread
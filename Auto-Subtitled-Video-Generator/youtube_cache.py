@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import threading
+
+APP_DIR = pathlib.Path(__file__).parent.absolute()
+
+CACHE_DIR = pathlib.Path(os.environ.get("ANUVADIKA_YOUTUBE_CACHE_DIR", APP_DIR / "cache" / "youtube"))
+
+# Size limit of each kind of cached artifact; each kind is evicted LRU on its own,
+# so a burst of large burned videos never pushes out the transcripts.
+LIMITS_MB = {
+    # Downloaded videos, shared by every model size and task.
+    "media": int(os.environ.get("ANUVADIKA_YOUTUBE_CACHE_MEDIA_MB", "8192")),
+    # Transcripts, subtitles and the result metadata.
+    "subtitles": int(os.environ.get("ANUVADIKA_YOUTUBE_CACHE_SUBTITLES_MB", "256")),
+    # Subtitled videos and their zip archives.
+    "burned": int(os.environ.get("ANUVADIKA_YOUTUBE_CACHE_BURNED_MB", "8192")),
+}
+
+# Result fields holding artifact paths; they are stored as bare file names.
+PATH_FIELDS = ("video", "subtitled_video", "zip", "txt", "vtt", "srt")
+RESULT = "result.json"
+
+
+def _link(src, dst):
+    """Hard-link ``src`` to ``dst``, copying across filesystems."""
+    dst = pathlib.Path(dst)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _relocate(result: dict, directory) -> dict:
+    """Copy of a result with its artifact paths re-rooted in ``directory``."""
+    moved = dict(result)
+    for field in PATH_FIELDS:
+        if moved.get(field):
+            moved[field] = str(pathlib.Path(directory) / pathlib.Path(moved[field]).name)
+    if moved.get("translation"):
+        moved["translation"] = _relocate(moved["translation"], directory)
+    return moved
+
+
+def _files(result: dict):
+    files = [result[field] for field in PATH_FIELDS if result.get(field)]
+    if result.get("translation"):
+        files += _files(result["translation"])
+    return files
+
+
+class YouTubeCache:
+    """
+    Finished YouTube jobs keyed by video ID and the options that change the
+    output, plus the downloaded media keyed by video ID alone.
+
+    A repeat request is served by hard-linking the cached files into the new
+    job's workspace, so it needs neither the network nor the model. Artifacts
+    are evicted least recently used per kind; an entry missing any of its
+    files is a miss, and the job then reuses whatever is still cached.
+    """
+
+    def __init__(self, directory=CACHE_DIR, limits_mb=LIMITS_MB):
+        self.directory = pathlib.Path(directory)
+        self.limits = {kind: mb * 1024 * 1024 for kind, mb in limits_mb.items()}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(video_id: str, **options) -> str:
+        digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()
+        return f"{video_id}-{digest[:16]}"
+
+    def _media_path(self, video_id: str) -> pathlib.Path:
+        return self.directory / "media" / f"{video_id}.mp4"
+
+    def _entry_dir(self, key: str) -> pathlib.Path:
+        return self.directory / "results" / key
+
+    @staticmethod
+    def kind_of(path: pathlib.Path) -> str:
+        if path.parent.name == "media":
+            return "media"
+        return "burned" if path.suffix in (".mp4", ".zip") else "subtitles"
+
+    def get_media(self, video_id: str, out_dir):
+        """Link the cached download of a video into ``out_dir``, or return None."""
+        path = self._media_path(video_id)
+        target = pathlib.Path(out_dir) / "youtube_video.mp4"
+        try:
+            os.utime(path)
+            _link(path, target)
+        except OSError:
+            # Not cached, or evicted while being linked.
+            return None
+        return str(target)
+
+    def put_media(self, video_id: str, video):
+        path = self._media_path(video_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _link(video, path)
+        self.evict("media")
+
+    def get_result(self, key: str, video_id: str, out_dir, count_miss: bool = True):
+        """
+        Link a cached result and its video into ``out_dir`` and return the
+        result with paths pointing there, or None on a miss.
+
+        Pass ``count_miss=False`` when re-checking a request whose miss was
+        already counted, so the dashboard counts each request once.
+        """
+        entry = self._entry_dir(key)
+        try:
+            with open(entry / RESULT, encoding="utf-8") as f:
+                result = json.load(f)
+            names = [pathlib.Path(p).name for p in _files(result) if pathlib.Path(p).name != "youtube_video.mp4"]
+            if self.get_media(video_id, out_dir) is None:
+                raise FileNotFoundError(self._media_path(video_id))
+            # An eviction can remove a file at any point; any failure to link is a miss.
+            for name in names:
+                os.utime(entry / name)
+                _link(entry / name, pathlib.Path(out_dir) / name)
+            os.utime(entry / RESULT)
+        except (OSError, ValueError):
+            if count_miss:
+                self.misses += 1
+            return None
+        self.hits += 1
+        return _relocate(result, out_dir)
+
+    def put_result(self, key: str, result: dict):
+        entry = self._entry_dir(key)
+        entry.mkdir(parents=True, exist_ok=True)
+        for path in _files(result):
+            if pathlib.Path(path).name != "youtube_video.mp4":
+                _link(path, entry / pathlib.Path(path).name)
+        tmp = entry / f"{RESULT}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_relocate(result, "."), f)
+        os.replace(tmp, entry / RESULT)
+        self.evict("subtitles")
+        self.evict("burned")
+
+    def files(self, kind: str = None):
+        files = [p for p in self.directory.rglob("*") if p.is_file() and not p.name.endswith(".tmp")]
+        return [p for p in files if kind is None or self.kind_of(p) == kind]
+
+    def evict(self, kind: str):
+        with self._lock:
+            entries = sorted(((p, p.stat()) for p in self.files(kind)), key=lambda e: e[1].st_mtime)
+            total = sum(stat.st_size for _, stat in entries)
+            for path, stat in entries:
+                if total <= self.limits[kind]:
+                    break
+                path.unlink(missing_ok=True)
+                total -= stat.st_size
+
+    def stats(self) -> dict:
+        files = self.files() if self.directory.exists() else []
+        usage = {kind: 0 for kind in self.limits}
+        for path in files:
+            usage[self.kind_of(path)] += path.stat().st_size
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes": usage,
+            "limits": dict(self.limits),
+        }
+
+
+youtube_cache = YouTubeCache()